@@ -2,25 +2,75 @@
 
 import os
 import json
-from datetime import datetime
+import hashlib
+import mimetypes
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from threading import Lock, Thread
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, FrozenSet, List, Dict, Any, Optional, Set, Tuple
+from urllib.parse import quote
 
-from flask import abort, jsonify, redirect, render_template, request, send_from_directory, url_for
+from flask import Response, abort, jsonify, make_response, redirect, render_template, request, url_for
+from werkzeug.utils import send_file
 from app.core.main.BasePlugin import BasePlugin
 from app.core.lib.cache import existInCache, getCacheDir, getFullFilename, saveToCache
 from app.authentication.handlers import handle_user_required
 
-from plugins.Docs.constants import DOC_ASSET_EXTENSIONS
+from plugins.Docs.constants import (
+    DOC_ASSET_EXTENSIONS,
+    DOC_ASSET_MAX_AGE,
+    DOC_ASSET_IMMUTABLE_MAX_AGE,
+    DOC_ASSET_CACHE_MAX,
+    DOCS_DEV_MAX_AGE,
+    SENDFILE_MODES,
+    DEFAULT_SENDFILE_MODE,
+    DEFAULT_ACCEL_REDIRECT_PREFIX,
+    DEFAULT_INDEX_WORKERS,
+    DEFAULT_RENDER_CACHE_MAX_ENTRIES,
+    DEFAULT_RENDER_CACHE_MAX_MB,
+    DEFAULT_DISK_CACHE_MAX_MB,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_MAX_MB,
+    SEARCH_PER_PAGE,
+    SUGGEST_LIMIT,
+    SEARCH_BACKENDS,
+    DEFAULT_SEARCH_BACKEND,
+    DEFAULT_COMPRESSED_CACHE_MAX_MB,
+    COMPRESS_MIN_BYTES,
+    GZIP_LEVEL,
+    BROTLI_QUALITY,
+    RENDER_PIPELINE_VERSION,
+    MARKDOWN_MODES,
+    DEFAULT_MARKDOWN_MODE,
+    PREWARM_MODES,
+    DEFAULT_PREWARM_MODE,
+    DEFAULT_PREWARM_MAX_DOCS,
+    IMAGE_VARIANT_MODES,
+    DEFAULT_IMAGE_VARIANT_MODE,
+    IMAGE_VARIANT_WIDTHS,
+    IMAGE_VARIANT_QUALITY,
+    WATCH_MODES,
+    DEFAULT_WATCH_MODE,
+    WATCH_DEBOUNCE_SECONDS,
+    WATCH_POLL_SECONDS,
+    DOC_LOOKUP_MISS_CACHE_MAX,
+)
 from plugins.Docs.markdown_converter import get_markdown_converter
 from plugins.Docs.markdown_processor import (
+    extract_toc,
     process_jekyll_links,
-    process_mermaid_blocks,
-    process_code_blocks_for_prism,
-    process_github_alerts,
-    process_color_swatches,
+    postprocess_html,
     LinkResolver,
 )
+from plugins.Docs.image_derivatives import MIME_TYPES, ImageDerivatives, supported_formats
+from plugins.Docs.render_cache import (
+    CONTENT_ENCODINGS, DiskRenderCache, PrecompressedBody, RenderCache, compress_variants
+)
+from plugins.Docs.inverted_index import InvertedIndex
+from plugins.Docs.search_backends import SearchBackend, make_search_backend
+from plugins.Docs.suggest_index import SuggestIndex
+from plugins.Docs.watcher import DocsWatcher
 from plugins.Docs import indexer
 
 try:
@@ -34,6 +84,7 @@ class Docs(BasePlugin):
 
     def __init__(self, app):
         super().__init__(app, "Docs")
+        self._app = app
         self.title = "Documentation"
         self.description = "Project documentation viewer"
         self.category = "System"
@@ -49,34 +100,230 @@ class Docs(BasePlugin):
         self.plugins_dir = os.path.join(self.project_root, "plugins")
 
         self._docs_index: List[Dict[str, Any]] = []
-        self._html_cache: Dict[Tuple[str, str], str] = {}
+        self._html_cache = RenderCache(DEFAULT_RENDER_CACHE_MAX_ENTRIES, DEFAULT_RENDER_CACHE_MAX_MB * 1024 * 1024)
+        self._disk_render_cache = DiskRenderCache(
+            os.path.join(getCacheDir(), "Docs", "render"), DEFAULT_DISK_CACHE_MAX_MB * 1024 * 1024
+        )
+        self._compressed_cache = RenderCache(
+            DEFAULT_RENDER_CACHE_MAX_ENTRIES, DEFAULT_COMPRESSED_CACHE_MAX_MB * 1024 * 1024
+        )
+        self._compressed_cache_enabled = DEFAULT_COMPRESSED_CACHE_MAX_MB > 0
+        self._search_cache = RenderCache(SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_MAX_MB * 1024 * 1024)
         self._doc_entry_map: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._doc_alias_map: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._doc_entry_misses: Set[Tuple[str, str, bool]] = set()
+        self._doc_paths_hash = ""
+        self._index_generation = ""
+        self._index_last_modified: Optional[float] = None
         self._docs_by_source: Dict[str, List[Dict[str, Any]]] = {}
-        self._category_docs_cache: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._category_tree_cache: Dict[str, Tuple[Any, ...]] = {}
+        self._sidebar_html_cache: Dict[Tuple[str, str], Any] = {}
+        # Search-as-you-type prefix index, and per locale the doc keys it may suggest
+        self._suggest_index = SuggestIndex()
+        self._suggest_visible: Dict[str, FrozenSet[Tuple[str, str]]] = {}
+        # (source_id, asset path) -> resolved file {"path", "size", "mtime", "mimetype", "digest"}
+        self._asset_cache: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._image_derivatives = ImageDerivatives(
+            os.path.join(getCacheDir(), "Docs", "images"), IMAGE_VARIANT_WIDTHS, IMAGE_VARIANT_QUALITY
+        )
+        self._image_formats: Tuple[str, ...] = ()
+        self._watcher: Optional[DocsWatcher] = None
+        self._watcher_mode = "off"
         self._whoosh_index_dir = os.path.join(getCacheDir(), "Docs", "whoosh")
+        self._sqlite_index_path = os.path.join(getCacheDir(), "Docs", "search.sqlite3")
+        self._search_backend: SearchBackend = make_search_backend(DEFAULT_SEARCH_BACKEND, self)
+        self._search_backend_name: Optional[str] = None
+        # In-memory BM25 search fallback, kept up to date with the index (see indexer.build_fallback_index)
+        self._fallback_index: Optional[InvertedIndex] = None
         self._index_built_at: Optional[datetime] = None
         self._index_build_lock = Lock()
         self._index_build_thread: Optional[Thread] = None
         self._progress_filename = "index_progress.json"
         self._link_resolver: Optional[LinkResolver] = None
+        self._markdown_mode = DEFAULT_MARKDOWN_MODE
+        # Approximate per-(source_id, path, locale) view counters, used to pick docs to pre-render
+        self._doc_views: Counter = Counter()
+        # Pre-rendering runs on its own worker after a rebuild is published; a newer run number cancels it
+        self._prewarm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="DocsPrewarm")
+        self._prewarm_run = 0
+        # Script root (mount prefix) of the last doc request; pre-rendered links are built under it
+        self._script_root: Optional[str] = None
 
     def _get_link_resolver(self) -> LinkResolver:
         if self._link_resolver is None:
             self._link_resolver = LinkResolver(
-                get_doc_entry=self._get_doc_entry,
+                get_doc_entry=lambda source_id, path: self._get_doc_entry(source_id, path, follow_alias=True),
                 url_for=url_for,
+                get_asset_version=self._get_asset_version,
+                get_image_info=self._get_image_info,
             )
         return self._link_resolver
 
     def _normalize_doc_path(self, path: str) -> str:
         return os.path.normpath(path).replace("\\", "/")
 
-    def _get_doc_entry(self, source_id: str, path: str) -> Optional[Dict[str, Any]]:
-        path_norm = self._normalize_doc_path(path)
-        entry = self._doc_entry_map.get((source_id, path_norm))
+    def _get_doc_entry(self, source_id: str, path: str, follow_alias: bool = False) -> Optional[Dict[str, Any]]:
+        """Index entry for (source_id, path) via hash lookups; follow_alias also maps docs/<path> to <path>."""
+        entry = self._doc_entry_map.get((source_id, path))
         if entry:
             return entry
-        return indexer.get_doc_entry(self._docs_index, source_id, path_norm)
+        miss_key = (source_id, path, follow_alias)
+        misses = self._doc_entry_misses
+        if miss_key in misses:
+            return None
+        key = (source_id, self._normalize_doc_path(path))
+        entry = self._doc_entry_map.get(key) or (self._doc_alias_map.get(key) if follow_alias else None)
+        if entry is None:
+            if len(misses) >= DOC_LOOKUP_MISS_CACHE_MAX:
+                misses.clear()
+            misses.add(miss_key)
+        return entry
+
+    def _get_int_setting(self, name: str, default: int, minimum: int = 1) -> int:
+        """Read integer plugin setting, falling back to default on missing/invalid values."""
+        try:
+            value = int((getattr(self, "config", None) or {}).get(name, default))
+        except (TypeError, ValueError):
+            value = default
+        return max(minimum, value)
+
+    def _get_markdown_mode(self) -> str:
+        mode = (getattr(self, "config", None) or {}).get("markdown_mode", DEFAULT_MARKDOWN_MODE)
+        return mode if mode in MARKDOWN_MODES else DEFAULT_MARKDOWN_MODE
+
+    def _get_prewarm_mode(self) -> str:
+        mode = (getattr(self, "config", None) or {}).get("prewarm_mode", DEFAULT_PREWARM_MODE)
+        return mode if mode in PREWARM_MODES else DEFAULT_PREWARM_MODE
+
+    def _get_sendfile_mode(self) -> str:
+        mode = (getattr(self, "config", None) or {}).get("sendfile_mode", DEFAULT_SENDFILE_MODE)
+        return mode if mode in SENDFILE_MODES else DEFAULT_SENDFILE_MODE
+
+    def _get_image_variant_mode(self) -> str:
+        mode = (getattr(self, "config", None) or {}).get("image_variant_mode", DEFAULT_IMAGE_VARIANT_MODE)
+        return mode if mode in IMAGE_VARIANT_MODES else DEFAULT_IMAGE_VARIANT_MODE
+
+    def _get_watch_mode(self) -> str:
+        mode = (getattr(self, "config", None) or {}).get("watch_mode", DEFAULT_WATCH_MODE)
+        return mode if mode in WATCH_MODES else DEFAULT_WATCH_MODE
+
+    def _get_search_backend(self) -> str:
+        name = (getattr(self, "config", None) or {}).get("search_backend", DEFAULT_SEARCH_BACKEND)
+        return name if name in SEARCH_BACKENDS else DEFAULT_SEARCH_BACKEND
+
+    def _apply_settings(self) -> None:
+        mode = self._get_markdown_mode()
+        image_formats = supported_formats(self._get_image_variant_mode())
+        if mode != self._markdown_mode or image_formats != self._image_formats:
+            self._markdown_mode = mode
+            self._image_formats = image_formats
+            self._html_cache.clear()
+        self._html_cache.configure(
+            self._get_int_setting("render_cache_max_entries", DEFAULT_RENDER_CACHE_MAX_ENTRIES),
+            self._get_int_setting("render_cache_max_mb", DEFAULT_RENDER_CACHE_MAX_MB) * 1024 * 1024,
+        )
+        self._disk_render_cache.configure(
+            self._get_int_setting("disk_cache_max_mb", DEFAULT_DISK_CACHE_MAX_MB, minimum=0) * 1024 * 1024
+        )
+        compressed_mb = self._get_int_setting("compressed_cache_max_mb", DEFAULT_COMPRESSED_CACHE_MAX_MB, minimum=0)
+        self._compressed_cache_enabled = compressed_mb > 0
+        if self._compressed_cache_enabled:
+            self._compressed_cache.configure(
+                self._get_int_setting("render_cache_max_entries", DEFAULT_RENDER_CACHE_MAX_ENTRIES),
+                compressed_mb * 1024 * 1024,
+            )
+        else:
+            self._compressed_cache.clear()
+        self._configure_search_backend()
+        self._configure_watcher()
+
+    def _configure_search_backend(self) -> None:
+        """Switch the full-text search backend per the setting; the new one is rebuilt in full.
+        Indexes on disk are left alone at startup, so a restart does not rebuild the search index."""
+        name = self._get_search_backend()
+        if name == self._search_backend_name:
+            return
+        starting = self._search_backend_name is None
+        self._search_backend_name = name
+        if self._search_backend.name != name:
+            self._search_backend.close()
+            self._search_backend = make_search_backend(name, self)
+            self._search_cache.clear()
+            self._discard_search_responses()
+        if starting:
+            return
+        # Inactive indexes are not kept up to date, so they are deleted and rebuilt when selected again;
+        # the selected one may be left from an earlier selection, so it is rebuilt from scratch too
+        for other in SEARCH_BACKENDS:
+            if other != name:
+                make_search_backend(other, self).clear()
+        self._search_backend.clear()
+        if self._docs_index:
+            self._start_index_rebuild_async()
+
+    def _configure_watcher(self) -> None:
+        """Start, restart or stop the doc source watcher per the watch mode setting."""
+        mode = self._get_watch_mode()
+        if mode == self._watcher_mode:
+            return
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+        self._watcher_mode = mode
+        if mode == "off":
+            return
+        watcher = DocsWatcher(
+            get_roots=self._watch_roots,
+            snapshot=self._watch_snapshot,
+            on_change=self._on_docs_changed,
+            is_source_dir=self._is_doc_source_dir,
+            debounce=WATCH_DEBOUNCE_SECONDS,
+            poll_interval=WATCH_POLL_SECONDS,
+            use_inotify=mode == "auto",
+            logger=self.logger,
+        )
+        watcher.start()
+        self._watcher = watcher
+        self.logger.info("Docs watcher started (%s)", watcher.backend)
+
+    def _watch_roots(self) -> List[Tuple[str, bool]]:
+        """Directories for the inotify watcher: doc trees recursively, plugin roots (root docs, new docs/)
+        and the plugins directory (new plugins) non-recursively."""
+        roots = [(os.path.join(self.project_root, "docs"), True), (self.plugins_dir, False)]
+        for name in self._discover_plugin_names():
+            plugin_path = os.path.join(self.plugins_dir, name)
+            roots.append((plugin_path, False))
+            roots.append((os.path.join(plugin_path, "docs"), True))
+        return roots
+
+    def _watch_snapshot(self) -> Dict[str, Tuple[float, int]]:
+        """{doc file: (mtime, size)} of all doc sources, for the polling watcher."""
+        files: Dict[str, Tuple[float, int]] = {}
+        for source_id in indexer.list_doc_sources(self):
+            for _sid, _rel, full in indexer.scan_doc_source(self, source_id):
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                files[full] = (st.st_mtime, st.st_size)
+        return files
+
+    def _is_doc_source_dir(self, path: str) -> bool:
+        """True for directories whose appearance or removal changes the set of doc sources or doc trees."""
+        path = os.path.abspath(path)
+        if os.path.dirname(path) == os.path.abspath(self.plugins_dir) or os.path.basename(path) == "docs":
+            return True
+        return (os.sep + "docs" + os.sep) in path
+
+    def _on_docs_changed(self, files: Set[str], rescan: bool) -> bool:
+        """Watcher callback: targeted index update for changed files, or an incremental rebuild after
+        directory changes. Returns False while another index update is running (the watcher retries)."""
+        if rescan or not self._docs_index:
+            started = self._start_index_rebuild_async()
+            if started and self._watcher is not None:
+                self._watcher.reschedule()
+            return started
+        return self._start_index_rebuild_async(files)
 
     def _ensure_index_started(self) -> bool:
         if self._docs_index:
@@ -91,6 +338,11 @@ class Docs(BasePlugin):
             self.logger.info("Docs plugin initialized (Markdown: %s)", name)
         except ImportError as e:
             self.logger.warning("Docs plugin: no Markdown converter: %s", e)
+        self._image_derivatives.load()
+        self._apply_settings()
+        self._doc_views.update(indexer.load_view_counts())
+        if indexer.load_index_snapshot(self):
+            self.logger.info("Docs index loaded from snapshot: %s entries", len(self._docs_index))
         self._start_index_rebuild_async()
 
     def admin(self, request):
@@ -104,11 +356,66 @@ class Docs(BasePlugin):
                 try:
                     from plugins.Docs.pdoc_generator import generate_docs_dev
                     ok, msg = generate_docs_dev(project_root=self.project_root)
+                    self._asset_cache = {}
                     status_ok = ok
                     status_message = msg
                 except Exception as ex:
                     status_ok = False
                     status_message = str(ex)
+            elif action == "save_settings":
+                try:
+                    self.config["index_workers"] = max(1, int(request.form.get("index_workers") or DEFAULT_INDEX_WORKERS))
+                    self.config["render_cache_max_entries"] = max(
+                        1, int(request.form.get("render_cache_max_entries") or DEFAULT_RENDER_CACHE_MAX_ENTRIES)
+                    )
+                    self.config["render_cache_max_mb"] = max(
+                        1, int(request.form.get("render_cache_max_mb") or DEFAULT_RENDER_CACHE_MAX_MB)
+                    )
+                    self.config["disk_cache_max_mb"] = max(
+                        0, int(request.form.get("disk_cache_max_mb") or DEFAULT_DISK_CACHE_MAX_MB)
+                    )
+                    self.config["compressed_cache_max_mb"] = max(
+                        0, int(request.form.get("compressed_cache_max_mb") or DEFAULT_COMPRESSED_CACHE_MAX_MB)
+                    )
+                    markdown_mode = request.form.get("markdown_mode") or DEFAULT_MARKDOWN_MODE
+                    if markdown_mode not in MARKDOWN_MODES:
+                        raise ValueError(f"Unknown markdown mode: {markdown_mode}")
+                    self.config["markdown_mode"] = markdown_mode
+                    prewarm_mode = request.form.get("prewarm_mode") or DEFAULT_PREWARM_MODE
+                    if prewarm_mode not in PREWARM_MODES:
+                        raise ValueError(f"Unknown pre-warm mode: {prewarm_mode}")
+                    self.config["prewarm_mode"] = prewarm_mode
+                    self.config["prewarm_max_docs"] = max(
+                        1, int(request.form.get("prewarm_max_docs") or DEFAULT_PREWARM_MAX_DOCS)
+                    )
+                    sendfile_mode = request.form.get("sendfile_mode") or DEFAULT_SENDFILE_MODE
+                    if sendfile_mode not in SENDFILE_MODES:
+                        raise ValueError(f"Unknown sendfile mode: {sendfile_mode}")
+                    self.config["sendfile_mode"] = sendfile_mode
+                    image_variant_mode = request.form.get("image_variant_mode") or DEFAULT_IMAGE_VARIANT_MODE
+                    if image_variant_mode not in IMAGE_VARIANT_MODES:
+                        raise ValueError(f"Unknown image variant mode: {image_variant_mode}")
+                    self.config["image_variant_mode"] = image_variant_mode
+                    search_backend = request.form.get("search_backend") or DEFAULT_SEARCH_BACKEND
+                    if search_backend not in SEARCH_BACKENDS:
+                        raise ValueError(f"Unknown search backend: {search_backend}")
+                    self.config["search_backend"] = search_backend
+                    watch_mode = request.form.get("watch_mode") or DEFAULT_WATCH_MODE
+                    if watch_mode not in WATCH_MODES:
+                        raise ValueError(f"Unknown watch mode: {watch_mode}")
+                    self.config["watch_mode"] = watch_mode
+                    accel_prefix = (request.form.get("accel_redirect_prefix") or "").strip()
+                    accel_prefix = accel_prefix or DEFAULT_ACCEL_REDIRECT_PREFIX
+                    if not accel_prefix.startswith("/"):
+                        raise ValueError(f"X-Accel-Redirect prefix must start with '/': {accel_prefix}")
+                    self.config["accel_redirect_prefix"] = accel_prefix
+                    self.saveConfig()
+                    self._apply_settings()
+                    status_ok = True
+                    status_message = "Settings saved."
+                except Exception as ex:
+                    status_ok = False
+                    status_message = str(ex)
             elif action == "refresh_index":
                 try:
                     started = self._start_index_rebuild_async()
@@ -130,6 +437,27 @@ class Docs(BasePlugin):
             "status_message": status_message,
             "index_info": indexer.get_index_info(self),
             "index_progress": self._get_index_progress(),
+            "settings": {
+                "index_workers": indexer.get_index_workers(self),
+                "render_cache_max_entries": self._get_int_setting(
+                    "render_cache_max_entries", DEFAULT_RENDER_CACHE_MAX_ENTRIES
+                ),
+                "render_cache_max_mb": self._get_int_setting("render_cache_max_mb", DEFAULT_RENDER_CACHE_MAX_MB),
+                "disk_cache_max_mb": self._get_int_setting("disk_cache_max_mb", DEFAULT_DISK_CACHE_MAX_MB, minimum=0),
+                "compressed_cache_max_mb": self._get_int_setting(
+                    "compressed_cache_max_mb", DEFAULT_COMPRESSED_CACHE_MAX_MB, minimum=0
+                ),
+                "markdown_mode": self._get_markdown_mode(),
+                "prewarm_mode": self._get_prewarm_mode(),
+                "prewarm_max_docs": self._get_int_setting("prewarm_max_docs", DEFAULT_PREWARM_MAX_DOCS),
+                "image_variant_mode": self._get_image_variant_mode(),
+                "image_formats": self._image_formats,
+                "sendfile_mode": self._get_sendfile_mode(),
+                "search_backend": self._get_search_backend(),
+                "watch_mode": self._get_watch_mode(),
+                "watch_backend": self._watcher.backend if self._watcher else None,
+                "accel_redirect_prefix": self.config.get("accel_redirect_prefix") or DEFAULT_ACCEL_REDIRECT_PREFIX,
+            },
         }
         return self.render("docs_admin.html", context)
 
@@ -151,40 +479,44 @@ class Docs(BasePlugin):
                 locale = get_current_language() or "en"
             except Exception:
                 locale = "en"
-            categories = indexer.get_home_categories(self)
-            selected_id = request.args.get("category", "").strip() or (categories[0]["source_id"] if categories else "")
-            if selected_id and not any(c["source_id"] == selected_id for c in categories):
-                selected_id = categories[0]["source_id"] if categories else ""
-            selected_file = request.args.get("file", "").strip()
-            tree = []
-            for cat in categories:
-                docs = indexer.get_documents_for_category(self, cat["source_id"], locale)
-                tree.append({
-                    "source_id": cat["source_id"],
-                    "heading": cat["heading"],
-                    "icon_url": cat["icon_url"],
-                    "documents": docs,
-                })
-            doc_content_html = None
-            doc_title = None
-            if selected_id and selected_file:
-                content_result = self._get_doc_content_html(selected_id, selected_file, locale)
-                if content_result:
-                    doc_content_html, doc_title = content_result
-            selected_heading = next((c["heading"] for c in categories if c["source_id"] == selected_id), selected_id)
-            category_documents = next((t["documents"] for t in tree if t["source_id"] == selected_id), [])
-            return render_template(
-                "docs/home.html",
-                tree=tree,
-                selected_category=selected_id,
-                selected_file=selected_file,
-                selected_heading=selected_heading,
-                category_documents=category_documents,
-                doc_content_html=doc_content_html,
-                doc_title=doc_title,
-                locale=locale,
-                index_ready=index_ready,
-                index_progress=self._get_index_progress(),
+
+            def render():
+                tree = indexer.get_category_tree(self, locale)
+                selected_id = request.args.get("category", "").strip() or (tree[0]["source_id"] if tree else "")
+                if selected_id and not any(c["source_id"] == selected_id for c in tree):
+                    selected_id = tree[0]["source_id"] if tree else ""
+                selected_file = request.args.get("file", "").strip()
+                doc_content_html = None
+                doc_title = None
+                if selected_id and selected_file:
+                    content_result = self._get_doc_content_html(selected_id, selected_file, locale)
+                    if content_result:
+                        doc_content_html, doc_title = content_result
+                selected_heading = next((c["heading"] for c in tree if c["source_id"] == selected_id), selected_id)
+                category_documents = next((t["documents"] for t in tree if t["source_id"] == selected_id), ())
+                return render_template(
+                    "docs/home.html",
+                    sidebar_html=indexer.get_sidebar_html(self, locale, "home"),
+                    selected_category=selected_id,
+                    selected_file=selected_file,
+                    selected_heading=selected_heading,
+                    category_documents=category_documents,
+                    doc_content_html=doc_content_html,
+                    doc_title=doc_title,
+                    locale=locale,
+                    index_ready=index_ready,
+                    index_progress=self._get_index_progress(),
+                )
+
+            if not index_ready:
+                return render()
+            validator = self._doc_validator(
+                request.args.get("category", "").strip(), request.args.get("file", "").strip()
+            )
+            return self._conditional_response(
+                ("home", request.full_path, locale, self._index_generation, self._render_options(), validator[0]),
+                max(self._index_last_modified or 0, validator[1]) or None,
+                render,
             )
 
         @self.blueprint.route("/docs/<source_id>/<path:doc_path>")
@@ -202,34 +534,148 @@ class Docs(BasePlugin):
                 locale = get_current_language() or "en"
             except Exception:
                 locale = "en"
-            results = indexer.search_docs(self, q, locale) if q and index_ready else []
-            if request.args.get("format") == "json":
+
+            page = max(1, request.args.get("page", 1, type=int))
+            per_page = request.args.get("per_page", SEARCH_PER_PAGE, type=int)
+            as_json = request.args.get("format") == "json"
+
+            def render():
+                # JSON clients get snippets with ?snippets=1 or later from /docs/search/snippets
+                snippets = not as_json or request.args.get("snippets") == "1"
+                found = (
+                    indexer.search_docs_page(self, q, locale, page, per_page, snippets=snippets)
+                    if q and index_ready
+                    else {"results": [], "total": 0, "page": 1, "per_page": per_page, "pages": 1}
+                )
+                if as_json:
+                    fields = ("title", "url", "source_id", "path") + (("snippet",) if snippets else ())
+                    return jsonify({
+                        "query": q,
+                        "index_ready": index_ready,
+                        "total": found["total"],
+                        "page": found["page"],
+                        "per_page": found["per_page"],
+                        "pages": found["pages"],
+                        "results": [{k: r[k] for k in fields} for r in found["results"]],
+                    })
+                return render_template(
+                    "docs/search.html",
+                    sidebar_html=indexer.get_sidebar_html(self, locale, "search"),
+                    query=q,
+                    results=found["results"],
+                    total=found["total"],
+                    page=found["page"],
+                    pages=found["pages"],
+                    per_page=found["per_page"],
+                    locale=locale,
+                    index_ready=index_ready,
+                    index_progress=self._get_index_progress(),
+                )
+
+            if not index_ready:
+                return render()
+            return self._conditional_response(
+                ("search", request.full_path, locale, self._index_generation) + self._search_validator(),
+                self._index_last_modified,
+                render,
+                shared=as_json,
+            )
+
+        @self.blueprint.route("/docs/search/snippets")
+        @handle_user_required
+        def docs_search_snippets():
+            """Snippets of one search results page: JSON {"snippets": {"<source_id>:<path>": html}}."""
+            q = (request.args.get("q") or "").strip()
+            page = max(1, request.args.get("page", 1, type=int))
+            per_page = request.args.get("per_page", SEARCH_PER_PAGE, type=int)
+            try:
+                from app import get_current_language
+                locale = get_current_language() or "en"
+            except Exception:
+                locale = "en"
+            if not q or not self._ensure_index_started():
+                return jsonify({"query": q, "snippets": {}})
+
+            def render():
+                found = indexer.search_docs_page(self, q, locale, page, per_page, snippets=False)
+                return jsonify({"query": q, "snippets": indexer.get_search_snippets(self, q, found["results"])})
+
+            return self._conditional_response(
+                ("search_snippets", request.full_path, locale, self._index_generation) + self._search_validator(),
+                self._index_last_modified,
+                render,
+                shared=True,
+            )
+
+        @self.blueprint.route("/docs/suggest")
+        @handle_user_required
+        def docs_suggest():
+            """Search-as-you-type completions: JSON {"query", "suggestions": [{"text", "kind", "url"}]}."""
+            q = request.args.get("q") or ""
+            limit = request.args.get("limit", SUGGEST_LIMIT, type=int)
+            try:
+                from app import get_current_language
+                locale = get_current_language() or "en"
+            except Exception:
+                locale = "en"
+            if not q.strip() or not self._ensure_index_started():
+                return jsonify({"query": q, "suggestions": []})
+            return self._conditional_response(
+                ("suggest", request.full_path, locale, self._index_generation),
+                self._index_last_modified,
+                lambda: jsonify({"query": q, "suggestions": indexer.suggest_docs(self, q, locale, limit)}),
+            )
+
+        @self.blueprint.route("/docs/fragment")
+        @handle_user_required
+        def docs_fragment():
+            """Rendered doc for client-side navigation: JSON with title, content HTML and outline."""
+            source_id = request.args.get("category", "").strip()
+            doc_path = request.args.get("file", "").strip()
+            try:
+                from app import get_current_language
+                locale = get_current_language() or "en"
+            except Exception:
+                locale = "en"
+            if not self._docs_index:
+                abort(503)
+            path_norm = self._normalize_doc_path(doc_path)
+            token, mtime = self._doc_validator(source_id, path_norm)
+            if not token:
+                abort(404)
+
+            def render():
+                rendered = self._render_doc_html(source_id, path_norm, locale)
+                if rendered is None:
+                    abort(404)
+                html, entry = rendered
                 return jsonify({
-                    "query": q,
-                    "index_ready": index_ready,
-                    "results": [
-                        {"title": r["title"], "url": r["url"], "source_id": r["source_id"], "path": r["path"]}
-                        for r in results
-                    ],
-                })
-            categories = indexer.get_home_categories(self)
-            tree = []
-            for cat in categories:
-                docs = indexer.get_documents_for_category(self, cat["source_id"], locale)
-                tree.append({
-                    "source_id": cat["source_id"],
-                    "heading": cat["heading"],
-                    "icon_url": cat["icon_url"],
-                    "documents": docs,
+                    "source_id": source_id,
+                    "path": entry["path"],
+                    "title": entry["title"],
+                    "html": html,
+                    "toc": extract_toc(html),
+                    "home_url": url_for("Docs.docs_home", category=source_id, file=entry["path"]),
+                    "view_url": url_for("Docs.docs_view_by_source", source_id=source_id, doc_path=entry["path"]),
                 })
-            return render_template(
-                "docs/search.html",
-                tree=tree,
-                query=q,
-                results=results,
-                locale=locale,
-                index_ready=index_ready,
-                index_progress=self._get_index_progress(),
+
+            return self._conditional_response(
+                ("fragment", source_id, path_norm, locale, token, self._doc_paths_hash, self._render_options()),
+                mtime,
+                render,
+                shared=True,
+            )
+
+        @self.blueprint.route("/docs/image/<name>")
+        @handle_user_required
+        def docs_image_variant(name):
+            """Generated image variant; names are content-keyed, so they never change."""
+            full_path = self._image_derivatives.file_path(name)
+            asset = self._get_cached_file(("/docs/image", name), lambda: full_path) if full_path else None
+            if asset is None:
+                abort(404)
+            return self._send_asset(
+                asset, DOC_ASSET_IMMUTABLE_MAX_AGE, mimetype=MIME_TYPES[name.rsplit(".", 1)[1]], immutable=True
             )
 
         @self.blueprint.route("/docs/index_status")
@@ -267,17 +713,19 @@ class Docs(BasePlugin):
                 if not safe_path or safe_path == ".":
                     safe_path = "index.html"
 
-            full_path = os.path.join(self.docs_dev_dir, safe_path)
-
-            if not os.path.isfile(full_path):
+            def locate() -> Optional[str]:
+                full_path = os.path.join(self.docs_dev_dir, safe_path)
+                if os.path.isfile(full_path):
+                    return full_path
                 if not safe_path.endswith("index.html"):
                     index_path = os.path.join(os.path.dirname(full_path), "index.html")
                     if os.path.isfile(index_path):
-                        full_path = index_path
-                    else:
-                        abort(404)
-                else:
-                    abort(404)
+                        return index_path
+                return None
+
+            asset = self._get_cached_file(("/docs_dev", safe_path), locate)
+            if asset is None:
+                abort(404)
 
             if safe_path.endswith(".html"):
                 mimetype = "text/html"
@@ -286,13 +734,9 @@ class Docs(BasePlugin):
             elif safe_path.endswith(".js"):
                 mimetype = "application/javascript"
             else:
-                mimetype = None
+                mimetype = asset["mimetype"]
 
-            return send_from_directory(
-                self.docs_dev_dir,
-                os.path.relpath(full_path, self.docs_dev_dir).replace("\\", "/"),
-                mimetype=mimetype,
-            )
+            return self._send_asset(asset, DOCS_DEV_MAX_AGE, mimetype=mimetype)
 
     def _discover_plugin_names(self) -> List[str]:
         """List names of enabled (active) plugins only."""
@@ -304,15 +748,18 @@ class Docs(BasePlugin):
         names.sort(key=lambda s: s.lower())
         return names
 
-    def _start_index_rebuild_async(self) -> bool:
-        """Start index rebuild in a background thread."""
+    def _start_index_rebuild_async(self, files: Optional[Set[str]] = None) -> bool:
+        """Start index rebuild in a background thread; with files, only those doc files are updated."""
         with self._index_build_lock:
             if self._index_build_thread and self._index_build_thread.is_alive():
                 return False
 
             def run():
                 try:
-                    indexer.build_docs_index(self)
+                    if files is not None:
+                        indexer.update_docs_index(self, files)
+                    else:
+                        indexer.build_docs_index(self)
                 except Exception as ex:
                     self.logger.exception(ex)
                     self._set_index_progress(
@@ -368,61 +815,351 @@ class Docs(BasePlugin):
             return plugin_path
         return None
 
-    def _serve_doc_asset(self, source_id: str, asset_path: str):
-        """Serve an image/asset file from a doc source."""
+    def _locate_doc_asset(self, source_id: str, asset_path: str) -> Optional[str]:
+        """Absolute path of an image/asset file inside a doc source, or None."""
         base_dir = self._get_source_base_dir(source_id)
         if not base_dir or not os.path.isdir(base_dir):
-            abort(404)
+            return None
         path_norm = os.path.normpath(asset_path.replace("\\", "/").lstrip("/")).replace("\\", "/")
         if path_norm.startswith("..") or "/.." in path_norm:
-            abort(404)
+            return None
         ext = os.path.splitext(path_norm)[1].lower()
         if ext not in DOC_ASSET_EXTENSIONS:
-            abort(404)
+            return None
         full_path = os.path.abspath(os.path.normpath(os.path.join(base_dir, path_norm)))
         base_abs = os.path.abspath(base_dir)
         if full_path != base_abs and not full_path.startswith(base_abs + os.sep):
-            abort(404)
+            return None
         if not os.path.isfile(full_path) and source_id == "Docs":
             plugin_root = os.path.dirname(base_dir)
             fallback_path = os.path.abspath(os.path.normpath(os.path.join(plugin_root, path_norm)))
             plugin_abs = os.path.abspath(plugin_root)
             if fallback_path.startswith(plugin_abs + os.sep) and os.path.isfile(fallback_path):
                 full_path = fallback_path
-                base_dir = plugin_root
-                base_abs = plugin_abs
         if not os.path.isfile(full_path):
+            return None
+        return full_path
+
+    def _get_cached_file(self, key: Tuple[str, str], locate: Callable[[], Optional[str]]) -> Optional[Dict[str, Any]]:
+        """Resolved file for key, or None. Resolution by locate() is cached until the next index rebuild;
+        a cached file costs one stat, and is resolved again if it changed or disappeared."""
+        cache = self._asset_cache
+        asset = cache.get(key)
+        if asset is not None:
+            try:
+                st = os.stat(asset["path"])
+                if st.st_mtime == asset["mtime"] and st.st_size == asset["size"]:
+                    return asset
+            except OSError:
+                pass
+            cache.pop(key, None)
+        full_path = locate()
+        if not full_path:
+            return None
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return None
+        asset = {
+            "path": full_path,
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "mimetype": mimetypes.guess_type(full_path)[0] or "application/octet-stream",
+            "digest": None,
+        }
+        if len(cache) >= DOC_ASSET_CACHE_MAX:
+            cache.clear()
+        cache[key] = asset
+        return asset
+
+    def _get_doc_asset(self, source_id: str, asset_path: str) -> Optional[Dict[str, Any]]:
+        return self._get_cached_file(
+            (source_id, asset_path), lambda: self._locate_doc_asset(source_id, asset_path)
+        )
+
+    def _asset_digest(self, asset: Dict[str, Any]) -> Optional[str]:
+        """Short content hash of a resolved asset, computed once per file version."""
+        if asset["digest"] is None:
+            digest = hashlib.sha1()
+            try:
+                with open(asset["path"], "rb") as f:
+                    for chunk in iter(lambda: f.read(65536), b""):
+                        digest.update(chunk)
+            except OSError:
+                return None
+            asset["digest"] = digest.hexdigest()[:12]
+        return asset["digest"]
+
+    def _get_asset_version(self, source_id: str, asset_path: str) -> Optional[str]:
+        """Version token for asset URLs emitted by the link resolver; None if the asset does not exist."""
+        asset = self._get_doc_asset(source_id, asset_path)
+        return self._asset_digest(asset) if asset else None
+
+    def _doc_assets_token(self, entry: Dict[str, Any]) -> str:
+        """Hash of the versions of the images a doc references, which its rendered HTML embeds as ?v=,
+        and of their generated variants (<picture> sources); part of its render cache keys and ETags
+        so a changed image is not served from stale HTML."""
+        refs = entry.get("image_refs")
+        if not refs:
+            return ""
+        source_id, current_dir = entry["source_id"], os.path.dirname(entry["path"])
+        resolver = self._get_link_resolver()
+        parts = []
+        for url in refs:
+            target = resolver.resolve_asset_target(source_id, current_dir, url)
+            if not target:
+                continue
+            asset = self._get_doc_asset(source_id, target)
+            if asset is None:
+                parts.append(f"{target}=")
+                continue
+            variant_key = self._image_variant_key(asset) if self._image_formats else ""
+            if variant_key and self._image_derivatives.get(variant_key) is None:
+                variant_key = ""
+            parts.append(f"{target}={self._asset_digest(asset) or ''}:{variant_key}")
+        return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:12] if parts else ""
+
+    def _image_variant_key(self, asset: Dict[str, Any]) -> str:
+        return self._image_derivatives.key(asset["path"], asset["mtime"], asset["size"], self._image_formats)
+
+    def _get_image_info(self, source_id: str, asset_path: str) -> Optional[Dict[str, Any]]:
+        """Intrinsic size and <source> srcsets of a doc image with generated variants, or None."""
+        if not self._image_formats:
+            return None
+        asset = self._get_doc_asset(source_id, asset_path)
+        item = self._image_derivatives.get(self._image_variant_key(asset)) if asset else None
+        if not item:
+            return None
+        sources = [
+            {
+                "type": MIME_TYPES[fmt],
+                "srcset": ", ".join(
+                    f'{url_for("Docs.docs_image_variant", name=name)} {width}w' for width, name in item["variants"][fmt]
+                ),
+            }
+            for fmt in self._image_formats
+            if item["variants"].get(fmt)
+        ]
+        return {"width": item["width"], "height": item["height"], "sources": sources}
+
+    def _serve_doc_asset(self, source_id: str, asset_path: str):
+        """Serve an image/asset file from a doc source. URLs with the current content hash (?v=) are immutable."""
+        asset = self._get_doc_asset(source_id, asset_path)
+        if asset is None:
             abort(404)
-        rel = os.path.relpath(full_path, base_dir).replace("\\", "/")
-        return send_from_directory(base_dir, rel)
+        version = request.args.get("v")
+        if version and version == self._asset_digest(asset):
+            return self._send_asset(asset, DOC_ASSET_IMMUTABLE_MAX_AGE, immutable=True)
+        return self._send_asset(asset, DOC_ASSET_MAX_AGE)
 
-    def _get_doc_content_html(self, source_id: str, doc_path: str, locale: str = "en") -> Optional[Tuple[str, str]]:
-        """Return (content_html, title) for embedding in home page, or None if not found."""
+    def _send_asset(
+        self, asset: Dict[str, Any], max_age: int, mimetype: Optional[str] = None, immutable: bool = False
+    ) -> Response:
+        """Conditional response for a resolved file, sent by Flask or handed to the front server
+        (X-Sendfile / X-Accel-Redirect) depending on the sendfile setting."""
+        mimetype = mimetype or asset["mimetype"]
+        mode = self._get_sendfile_mode()
+        rel = os.path.relpath(asset["path"], self.project_root).replace("\\", "/")
+        if mode == "x-accel-redirect" and not rel.startswith(".."):
+            prefix = (self.config.get("accel_redirect_prefix") or DEFAULT_ACCEL_REDIRECT_PREFIX).rstrip("/")
+            response = Response(mimetype=mimetype)
+            response.headers["X-Accel-Redirect"] = f"{prefix}/{quote(rel)}"
+            response.set_etag(f"{asset['mtime']}-{asset['size']}")
+            response.last_modified = datetime.fromtimestamp(int(asset["mtime"]), tz=timezone.utc)
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response = response.make_conditional(request)
+        else:
+            response = send_file(
+                asset["path"],
+                request.environ,
+                mimetype=mimetype,
+                max_age=max_age,
+                use_x_sendfile=mode == "x-sendfile",
+            )
+        if immutable:
+            response.cache_control.immutable = True
+        return response
+
+    def _disk_cache_key(
+        self,
+        source_id: str,
+        path_norm: str,
+        entry: Dict[str, Any],
+        locale: str,
+        st: os.stat_result,
+        assets: str,
+        script_root: str,
+    ) -> Optional[str]:
+        """Disk render cache key: content hash, referenced image versions, locale, converter, markdown mode,
+        image variants, pipeline version, script root and indexed doc set (links are resolved against the
+        index). None if the disk cache is disabled."""
+        if not self._disk_render_cache.enabled:
+            return None
+        content_hash = self._indexed_content_hash(entry, st)
+        try:
+            if not content_hash:
+                content_hash = indexer.file_content_hash(entry["file_path"])
+            _, converter_name = get_markdown_converter()
+        except (OSError, ImportError):
+            return None
+        return DiskRenderCache.make_key(
+            RENDER_PIPELINE_VERSION,
+            self._render_options(),
+            converter_name,
+            content_hash,
+            assets,
+            locale,
+            source_id,
+            path_norm,
+            script_root,
+            self._doc_paths_hash,
+        )
+
+    @staticmethod
+    def _indexed_content_hash(entry: Dict[str, Any], st: os.stat_result) -> Optional[str]:
+        """Content hash recorded when the doc was indexed, or None unless the file still has the mtime and
+        size it was hashed with (entries without a size, e.g. from an older snapshot, are never trusted)."""
+        if entry.get("mtime") != st.st_mtime or entry.get("size") != st.st_size:
+            return None
+        return entry.get("content_hash") or None
+
+    def _render_options(self) -> str:
+        """Settings that change rendered HTML of unchanged docs: markdown mode and image variant formats.
+        Variants of the images a doc references are part of its own keys (see _doc_assets_token)."""
+        if not self._image_formats:
+            return self._markdown_mode
+        return f"{self._markdown_mode}:{','.join(self._image_formats)}"
+
+    def _preprocess_markdown(self, text: str, resolver: LinkResolver, source_id: str, current_file_dir: str) -> str:
+        """Resolve Jekyll links and .md links/mentions before conversion, per the markdown mode setting."""
+        if self._markdown_mode == "regex":
+            text = process_jekyll_links(text)
+            return resolver.process_markdown_file_links(text, source_id, current_file_dir)
+        return resolver.preprocess_markdown(text, source_id, current_file_dir)
+
+    def _render_doc_html(
+        self, source_id: str, doc_path: str, locale: str, count_view: bool = True
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Render service used by all doc routes: return (content_html, entry) for an indexed .md doc, or None.
+
+        Lookup order is memory cache, disk cache, render. Concurrent misses for the same
+        document and locale are rendered once; the other requests wait for that result.
+        Rendered links include the request's script root, so it is part of the cache keys.
+        """
         path_norm = self._normalize_doc_path(doc_path)
         if path_norm.startswith("..") or path_norm.startswith("/") or not path_norm.lower().endswith(".md"):
             return None
         entry = self._get_doc_entry(source_id, path_norm)
-        if not entry or not os.path.isfile(entry["file_path"]):
+        if not entry:
             return None
-        cache_key = (source_id, path_norm, locale)
-        if cache_key in self._html_cache:
-            return self._html_cache[cache_key], entry["title"]
-        translate_fn = lambda k: safe_translate(k, locale)
-        with open(entry["file_path"], "r", encoding="utf-8") as f:
-            text = f.read()
-        current_file_dir = os.path.dirname(path_norm) or ""
-        text = process_jekyll_links(text)
+        try:
+            st = os.stat(entry["file_path"])
+        except OSError:
+            return None
+        assets = self._doc_assets_token(entry)
+        script_root = request.script_root
+        html = self._html_cache.get_or_create(
+            (source_id, path_norm, locale, script_root),
+            lambda: self._render_doc_uncached(source_id, path_norm, entry, locale, st, assets, script_root),
+            mtime=(st.st_mtime, st.st_size, assets),
+        )
+        if html is None:
+            return None
+        if count_view:
+            self._doc_views[(source_id, path_norm, locale)] += 1
+            self._script_root = script_root
+        return html, entry
+
+    def _prewarm_targets(self) -> List[Tuple[str, str, str]]:
+        """(source_id, path, locale) to pre-render per the pre-warm settings, least important first."""
+        mode = self._get_prewarm_mode()
+        if mode == "off":
+            return []
+        limit = self._get_int_setting("prewarm_max_docs", DEFAULT_PREWARM_MAX_DOCS)
+        indexed = set(self._doc_entry_map)
+        popular = [key for key, _n in self._doc_views.most_common() if (key[0], key[1]) in indexed]
+        if mode == "all":
+            locales = sorted({locale for _sid, _path, locale in popular}) or ["en"]
+            seen = set(popular)
+            popular += [
+                (e["source_id"], e["path"], locale)
+                for e in self._docs_index
+                for locale in locales
+                if (e["source_id"], e["path"], locale) not in seen
+            ]
+        # Reversed so the most viewed are rendered last and stay most recent in the LRU cache
+        return list(reversed(popular[:limit]))
+
+    def _schedule_prewarm(self) -> None:
+        """Queue pre-rendering of the published index on the pre-render worker, cancelling an earlier run."""
+        self._prewarm_run += 1
+        self._prewarm_executor.submit(self._prewarm_docs, self._prewarm_run)
+
+    def _cancel_prewarm(self) -> None:
+        """Stop a queued or running pre-render; called when a rebuild starts."""
+        self._prewarm_run += 1
+
+    def _prewarm_docs(self, run: int) -> None:
+        """Render docs into the memory/disk caches after an index rebuild (runs on the pre-render worker,
+        one doc at a time). Stops as soon as run is no longer the current run."""
+        # Links are built with url_for, which needs a request context outside of a request; it gets
+        # the application root from the app config, and the mount prefix real requests were seen under
+        overrides = {"SCRIPT_NAME": self._script_root} if self._script_root is not None else {}
+        with self._app.test_request_context("/", environ_overrides=overrides):
+            script_root = request.script_root
+            targets = [t for t in self._prewarm_targets() if t + (script_root,) not in self._html_cache]
+            warmed = 0
+            for source_id, path, locale in targets:
+                if run != self._prewarm_run:
+                    self.logger.info("Docs pre-render cancelled after %s of %s", warmed, len(targets))
+                    return
+                try:
+                    if self._render_doc_html(source_id, path, locale, count_view=False):
+                        warmed += 1
+                except Exception as ex:
+                    self.logger.warning("Docs pre-render failed for %s:%s: %s", source_id, path, ex)
+        if targets:
+            self.logger.info("Docs pre-rendered: %s of %s", warmed, len(targets))
+
+    def _render_doc_uncached(
+        self,
+        source_id: str,
+        path_norm: str,
+        entry: Dict[str, Any],
+        locale: str,
+        st: os.stat_result,
+        assets: str,
+        script_root: str,
+    ) -> Optional[str]:
+        """Disk cache lookup, then full render (stored on disk). None if the file cannot be read."""
+        disk_key = self._disk_cache_key(source_id, path_norm, entry, locale, st, assets, script_root)
+        html = self._disk_render_cache.get(disk_key) if disk_key else None
+        if html is not None:
+            return html
+        try:
+            with open(entry["file_path"], "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None
+        current_file_dir = os.path.dirname(path_norm)
         resolver = self._get_link_resolver()
-        text = resolver.process_markdown_file_links(text, source_id, current_file_dir)
+        text = self._preprocess_markdown(text, resolver, source_id, current_file_dir)
         convert, _ = get_markdown_converter()
         html = convert(text)
-        html = process_mermaid_blocks(html)
-        html = process_code_blocks_for_prism(html)
-        html = process_github_alerts(html, translate=translate_fn)
-        html = process_color_swatches(html)
-        html = resolver.process_markdown_links(html, source_id, current_file_dir)
-        html = resolver.process_markdown_images(html, source_id, current_file_dir)
-        self._html_cache[cache_key] = html
+        html = postprocess_html(
+            html, resolver, source_id, current_file_dir, translate=lambda k: safe_translate(k, locale)
+        )
+        if disk_key:
+            self._disk_render_cache.put(disk_key, html)
+        return html
+
+    def _get_doc_content_html(self, source_id: str, doc_path: str, locale: str = "en") -> Optional[Tuple[str, str]]:
+        """Return (content_html, title) for embedding in home page, or None if not found."""
+        rendered = self._render_doc_html(source_id, doc_path, locale)
+        if rendered is None:
+            return None
+        html, entry = rendered
         return html, entry["title"]
 
     def _render_markdown_doc_by_source(self, source_id: str, doc_path: str):
@@ -435,55 +1172,149 @@ class Docs(BasePlugin):
         if not self._ensure_index_started():
             return redirect(url_for("Docs.docs_home", category=source_id, file=doc_path))
         path_norm = self._normalize_doc_path(doc_path)
-        if path_norm.startswith("..") or path_norm.startswith("/"):
-            abort(404)
-        if not path_norm.lower().endswith(".md"):
+        token, mtime = self._doc_validator(source_id, path_norm)
+        if not token:
             abort(404)
 
-        entry = self._get_doc_entry(source_id, path_norm)
-        if not entry:
-            abort(404)
-        if not os.path.isfile(entry["file_path"]):
-            abort(404)
-
-        cache_key = (source_id, path_norm, locale)
-        if cache_key in self._html_cache:
+        def render():
+            rendered = self._render_doc_html(source_id, doc_path, locale)
+            if rendered is None:
+                abort(404)
             return render_template(
                 "docs/view.html",
-                content_html=self._html_cache[cache_key],
+                content_html=rendered[0],
                 filename=path_norm,
                 source_id=source_id,
                 doc_path=path_norm,
             )
 
-        translate_fn = lambda k: safe_translate(k, locale)
-        with open(entry["file_path"], "r", encoding="utf-8") as f:
-            text = f.read()
+        return self._conditional_response(
+            ("view", source_id, path_norm, locale, token, self._doc_paths_hash, self._render_options()), mtime, render
+        )
 
-        current_file_dir = os.path.dirname(path_norm)
-        if current_file_dir == ".":
-            current_file_dir = ""
+    def _discard_search_responses(self) -> None:
+        """Drop precompressed search bodies; called when search results may have changed."""
+        self._compressed_cache.discard_where(lambda key: key[0] in ("search", "search_snippets"))
 
-        text = process_jekyll_links(text)
-        resolver = self._get_link_resolver()
-        text = resolver.process_markdown_file_links(text, source_id, current_file_dir)
-        convert, _ = get_markdown_converter()
-        html = convert(text)
-        html = process_mermaid_blocks(html)
-        html = process_code_blocks_for_prism(html)
-        html = process_github_alerts(html, translate=translate_fn)
-        html = process_color_swatches(html)
-        html = resolver.process_markdown_links(html, source_id, current_file_dir)
-        html = resolver.process_markdown_images(html, source_id, current_file_dir)
-        self._html_cache[cache_key] = html
-
-        return render_template(
-            "docs/view.html",
-            content_html=html,
-            filename=path_norm,
-            source_id=source_id,
-            doc_path=path_norm,
-        )
+    def _search_validator(self) -> Tuple[Any, ...]:
+        """Search state results depend on besides the index: the engine, its index version and whether the
+        fallback index is built. The engine index is updated after the index is published, so both change."""
+        backend = self._search_backend
+        return backend.name, backend.generation, self._fallback_index is not None
+
+    def _doc_validator(self, source_id: str, doc_path: str) -> Tuple[str, float]:
+        """(content token, mtime) of an indexed doc for HTTP validators; ("", 0) if there is no such doc.
+        The token is the indexed content hash while the file has the mtime and size it was indexed with
+        (else those), plus the versions of the images it references."""
+        if not source_id or not doc_path:
+            return "", 0
+        entry = self._get_doc_entry(source_id, doc_path)
+        if not entry:
+            return "", 0
+        try:
+            st = os.stat(entry["file_path"])
+        except OSError:
+            return "", 0
+        assets = self._doc_assets_token(entry)
+        content_hash = self._indexed_content_hash(entry, st)
+        if content_hash:
+            return f"{content_hash}:{assets}", st.st_mtime
+        return f"{st.st_mtime}:{st.st_size}:{assets}", st.st_mtime
+
+    def _conditional_response(
+        self,
+        etag_parts: Tuple[Any, ...],
+        last_modified: Optional[float],
+        render: Callable[[], Any],
+        shared: bool = False,
+    ) -> Response:
+        """Return render() with a strong ETag and Last-Modified, or 304 without rendering when the
+        client's copy is current. Pages are per user (login required), so they are cached privately
+        and revalidated on each use.
+
+        shared marks bodies that do not depend on the user (JSON, no page layout): they are kept
+        precompressed per ETag and sent in the best encoding the client accepts. Other bodies are
+        rendered with the per-user layout, so their ETag includes the user. All responses vary by
+        Cookie, as they are sent only to logged-in users."""
+        parts = (self.version, RENDER_PIPELINE_VERSION) + tuple(etag_parts)
+        if not shared:
+            parts += (self._current_user_id(),)
+        etag = hashlib.sha1("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+        modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc) if last_modified else None
+        shared = shared and self._compressed_cache_enabled
+        if request.if_none_match:
+            # Compressed representations carry "<etag>-<encoding>"; any of them means the same content
+            current = [etag] + [f"{etag}-{enc}" for enc in CONTENT_ENCODINGS] if shared else [etag]
+            matched = next((tag for tag in current if request.if_none_match.contains(tag)), None)
+            not_modified = matched is not None
+        else:
+            matched = None
+            not_modified = bool(modified and request.if_modified_since and request.if_modified_since >= modified)
+        if not_modified:
+            response = Response(status=304)
+            response.set_etag(matched or etag)
+        elif shared:
+            response = self._precompressed_response(etag, render, kind=etag_parts[0])
+        else:
+            response = make_response(render())
+            response.set_etag(etag)
+        if shared:
+            response.vary.add("Accept-Encoding")
+        response.vary.add("Cookie")
+        if modified:
+            response.last_modified = modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    @staticmethod
+    def _current_user_id() -> str:
+        """Id of the logged-in user, or "" if there is none."""
+        try:
+            from flask_login import current_user
+        except ImportError:
+            return ""
+        if not getattr(current_user, "is_authenticated", False):
+            return ""
+        return str(current_user.get_id() or "")
+
+    def _precompressed_response(self, etag: str, render: Callable[[], Any], kind: str = "") -> Response:
+        """Serve render() from the precompressed cache (rendering and compressing once per ETag),
+        in the encoding preferred by Accept-Encoding. Non-200 responses are passed through uncached.
+        Bodies are cached under (kind, etag), kind being the first ETag part, so one kind can be dropped."""
+        rendered: List[Response] = []
+
+        def build() -> Optional[PrecompressedBody]:
+            response = make_response(render())
+            rendered.append(response)
+            if response.status_code != 200 or response.is_streamed:
+                return None
+            data = response.get_data()
+            return PrecompressedBody(
+                response.content_type,
+                data,
+                compress_variants(data, COMPRESS_MIN_BYTES, GZIP_LEVEL, BROTLI_QUALITY),
+            )
+
+        body = self._compressed_cache.get_or_create((kind, etag), build)
+        if body is None:
+            response = rendered[0] if rendered else make_response(render())
+            response.set_etag(etag)
+            return response
+        encoding = None
+        best = 0.0
+        for candidate in body.variants:
+            quality = request.accept_encodings.quality(candidate)
+            if quality > best:
+                encoding, best = candidate, quality
+        if encoding is None:
+            response = Response(body.data, content_type=body.content_type)
+            response.set_etag(etag)
+            return response
+        response = Response(body.variants[encoding], content_type=body.content_type)
+        response.headers["Content-Encoding"] = encoding
+        response.set_etag(f"{etag}-{encoding}")
+        return response
 
     def page(self, request):
         """Public page - redirects to admin."""
@@ -0,0 +1,129 @@
+"""Whoosh analyzers per doc language: stemming analyzers where Whoosh has them, a CJK bigram analyzer
+for Chinese, Japanese and Korean, and a plain analyzer for everything else. simple_terms() splits text
+the same way without Whoosh."""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from plugins.Docs.constants import CJK_LANGS, WHOOSH_DEFAULT_DOC_LANGS, WHOOSH_LANG_ALIASES
+
+try:
+    from whoosh.analysis import Filter, LanguageAnalyzer, LowercaseFilter, RegexTokenizer, StandardAnalyzer
+    from whoosh.lang import languages as STEM_LANGS
+except ImportError:
+    Filter = object
+    STEM_LANGS = ()
+
+# Field suffix of languages without a Whoosh stemmer, and of the CJK bigram fields
+PLAIN_LANG = "std"
+CJK_LANG = "cjk"
+
+# Hiragana, Katakana, CJK ideographs (with extension A and compatibility forms), Hangul
+_CJK = "\u1100-\u11ff\u3040-\u30ff\u3130-\u318f\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_CJK_RE = re.compile(f"[{_CJK}]")
+_RUN_RE = re.compile(f"[{_CJK}]+|[^{_CJK}]+")
+_WORD_RE = re.compile(r"\w+")
+
+
+class CjkBigramFilter(Filter):
+    """Splits runs of CJK characters into overlapping bigrams (a lone character is kept as is).
+
+    Other text passes through unchanged. Positions are renumbered, so a query word made of
+    several bigrams is matched as a phrase (see cjk_field()).
+    """
+
+    def __call__(self, tokens: Iterable[Any]) -> Iterator[Any]:
+        shift = 0
+        for t in tokens:
+            if t.positions:
+                t.pos += shift
+            if not _CJK_RE.search(t.text):
+                yield t
+                continue
+            text = t.text
+            pos = t.pos if t.positions else 0
+            start = t.startchar if t.chars else 0
+            count = 0
+            for run in _RUN_RE.finditer(text):
+                word = run.group()
+                if _CJK_RE.match(word):
+                    spans = [(i, i + 2) for i in range(len(word) - 1)] or [(0, 1)]
+                else:
+                    spans = [(0, len(word))]
+                for s, e in spans:
+                    t.text = word[s:e]
+                    if t.positions:
+                        t.pos = pos + count
+                    if t.chars:
+                        t.startchar = start + run.start() + s
+                        t.endchar = start + run.start() + e
+                    count += 1
+                    yield t
+            shift += count - 1
+
+
+def simple_terms(text: str, max_length: int = 40) -> List[str]:
+    """Lowercase words of text, with runs of CJK characters split into bigrams like CjkBigramFilter.
+
+    Words longer than max_length (hashes, encoded data) are dropped.
+    """
+    terms: List[str] = []
+    for word in _WORD_RE.findall(text.lower()):
+        if len(word) > max_length:
+            continue
+        if not _CJK_RE.search(word):
+            terms.append(word)
+            continue
+        for run in _RUN_RE.findall(word):
+            if not _CJK_RE.match(run):
+                terms.append(run)
+            elif len(run) == 1:
+                terms.append(run)
+            else:
+                terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def analyzer_lang(lang: str) -> str:
+    """Analyzer (field suffix) for a doc language code."""
+    lang = WHOOSH_LANG_ALIASES.get(lang, lang)
+    if lang in CJK_LANGS:
+        return CJK_LANG
+    if lang in STEM_LANGS:
+        return lang
+    return PLAIN_LANG
+
+
+def schema_langs(locales: Iterable[str]) -> Tuple[str, ...]:
+    """Analyzers the schema provides for locales; default doc languages and plain text are always included."""
+    return tuple(sorted({analyzer_lang(lang) for lang in locales} | set(WHOOSH_DEFAULT_DOC_LANGS) | {PLAIN_LANG}))
+
+
+def doc_langs(lang: str, available: Iterable[str]) -> Tuple[str, ...]:
+    """Analyzers a doc in language lang is indexed with; languages without a field in the schema go to plain text."""
+    if lang == "default":
+        return WHOOSH_DEFAULT_DOC_LANGS
+    key = analyzer_lang(lang)
+    return (key,) if key in available else (PLAIN_LANG,)
+
+
+def make_field(lang: str) -> Any:
+    """Indexed, unstored TEXT field for an analyzer from schema_langs()."""
+    from whoosh.fields import TEXT
+
+    if lang == CJK_LANG:
+        return TEXT(analyzer=RegexTokenizer() | LowercaseFilter() | CjkBigramFilter(), multitoken_query="phrase")
+    if lang == PLAIN_LANG:
+        return TEXT(analyzer=StandardAnalyzer(stoplist=None))
+    return TEXT(analyzer=LanguageAnalyzer(lang))
+
+
+def translation_locales(directory: str) -> Tuple[str, ...]:
+    """Locales with a <locale>.json file in the plugin translations directory."""
+    try:
+        return tuple(sorted(fn[:-5].lower() for fn in os.listdir(directory) if fn.endswith(".json")))
+    except OSError:
+        return ()
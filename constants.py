@@ -10,3 +10,98 @@ DOC_LANG_RE = re.compile(r"^(.+)\.([a-z]{2})\.md$", re.IGNORECASE)
 
 # Allowed image/asset extensions for doc-inlined resources
 DOC_ASSET_EXTENSIONS = frozenset((".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".bmp"))
+
+# Browser/proxy cache lifetime (seconds) for doc images/assets and generated developer docs
+DOC_ASSET_MAX_AGE = 86400
+DOCS_DEV_MAX_AGE = 3600
+
+# Asset URLs carrying the file's content hash (?v=...) never change, so they may be cached for a year
+DOC_ASSET_IMMUTABLE_MAX_AGE = 31536000
+
+# Resolved asset files (doc images, /docs_dev files) remembered until the next index rebuild
+DOC_ASSET_CACHE_MAX = 4096
+
+# How asset files are sent: "off" streams them from Flask, "x-sendfile" (Apache, lighttpd) and
+# "x-accel-redirect" (nginx) let the front server send the file. The nginx prefix is an internal
+# location aliased to the project root, e.g. location /_docs_files/ { internal; alias /opt/osysHome/; }
+SENDFILE_MODES = ("off", "x-sendfile", "x-accel-redirect")
+DEFAULT_SENDFILE_MODE = "off"
+DEFAULT_ACCEL_REDIRECT_PREFIX = "/_docs_files/"
+
+# Worker threads used to scan doc sources and parse files during index build
+DEFAULT_INDEX_WORKERS = 4
+
+# Rendered HTML cache budget (LRU): max documents x locales kept, and max memory in MB
+DEFAULT_RENDER_CACHE_MAX_ENTRIES = 200
+DEFAULT_RENDER_CACHE_MAX_MB = 16
+
+# Search results cache (LRU per normalized query and locale), cleared when the index changes
+SEARCH_CACHE_MAX_ENTRIES = 256
+SEARCH_CACHE_MAX_MB = 4
+
+# Search hits fetched per query, and results per page (default and maximum for ?per_page=)
+SEARCH_MAX_RESULTS = 100
+SEARCH_PER_PAGE = 20
+SEARCH_MAX_PER_PAGE = 100
+
+# Search-as-you-type suggestions (?limit= default and maximum). Index rows scanned per prefix, headings
+# kept per doc, word starts indexed per title or heading, and shortest word suggested as a query term
+SUGGEST_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_SCAN_LIMIT = 500
+SUGGEST_MAX_HEADINGS = 100
+SUGGEST_MAX_WORDS = 6
+SUGGEST_MIN_TERM_LENGTH = 3
+
+# Full-text search backends; the SQLite FTS5 index is rebuilt when its schema version changes
+SEARCH_BACKENDS = ("whoosh", "sqlite")
+DEFAULT_SEARCH_BACKEND = "whoosh"
+SQLITE_SEARCH_SCHEMA_VERSION = 1
+
+# Whoosh analyzers: languages indexed with another language's stemmer, analyzers for language-neutral
+# docs (README.md), and languages indexed as CJK character bigrams
+WHOOSH_LANG_ALIASES = {"uk": "ru", "be": "ru"}
+WHOOSH_DEFAULT_DOC_LANGS = ("ru", "en")
+CJK_LANGS = frozenset(("ja", "zh", "ko"))
+
+# On-disk rendered HTML cache (shared by workers, survives restarts); 0 disables it
+DEFAULT_DISK_CACHE_MAX_MB = 64
+
+# Precompressed copies (gzip, and brotli when installed) of doc fragment and search JSON responses;
+# 0 disables. Bodies below the minimum size are sent as is
+DEFAULT_COMPRESSED_CACHE_MAX_MB = 16
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+# Max remembered failed doc path lookups (broken links); reset on each index rebuild
+DOC_LOOKUP_MISS_CACHE_MAX = 4096
+
+# Markdown pre-processing: "structured" skips fenced code and rewrites links in one pass,
+# "regex" runs the original sequential substitutions over the whole text
+MARKDOWN_MODES = ("structured", "regex")
+DEFAULT_MARKDOWN_MODE = "structured"
+
+# Pre-render docs after each index rebuild: "popular" warms the most viewed documents (per locale
+# they were viewed in), "all" warms every document; the limit caps how many are rendered
+PREWARM_MODES = ("off", "popular", "all")
+DEFAULT_PREWARM_MODE = "popular"
+DEFAULT_PREWARM_MAX_DOCS = 50
+
+# Resized variants of raster doc images, generated at index time (requires Pillow): "webp", or "avif"
+# with WebP fallback; "off" disables them. Widths above the original image width are skipped
+IMAGE_VARIANT_MODES = ("off", "webp", "avif")
+DEFAULT_IMAGE_VARIANT_MODE = "off"
+IMAGE_VARIANT_WIDTHS = (480, 960, 1600)
+IMAGE_VARIANT_QUALITY = 80
+
+# Watch doc sources and update the index when docs change: "auto" uses inotify (watchdog package)
+# when installed and mtime polling otherwise, "polling" always polls. Bursts of changes are applied
+# together once no change has arrived for the debounce interval
+WATCH_MODES = ("off", "auto", "polling")
+DEFAULT_WATCH_MODE = "off"
+WATCH_DEBOUNCE_SECONDS = 1.0
+WATCH_POLL_SECONDS = 5.0
+
+# Bump when rendering/post-processing output changes, to invalidate the on-disk HTML cache
+RENDER_PIPELINE_VERSION = 3
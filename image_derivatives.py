@@ -0,0 +1,160 @@
+"""Image derivatives: resized WebP/AVIF variants of doc images, generated with Pillow when it is installed."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from threading import Lock, get_ident
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+    features = None
+
+# Raster images that can be resized; SVG, ICO and GIF (possibly animated) are served as is
+RASTER_EXTENSIONS = frozenset((".png", ".jpg", ".jpeg", ".webp", ".bmp"))
+
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+_NAME_RE = re.compile(r"^[0-9a-f]{20}-\d+\.(avif|webp)$")
+
+
+def supported_formats(mode: str) -> Tuple[str, ...]:
+    """Derivative formats for an image variant mode, best first, limited to what Pillow can write."""
+    if Image is None or mode == "off":
+        return ()
+    wanted = ("avif", "webp") if mode == "avif" else ("webp",)
+    return tuple(fmt for fmt in wanted if fmt in features.modules and features.check_module(fmt))
+
+
+class ImageDerivatives:
+    """Resized variants of doc images under a cache directory, described by a JSON manifest.
+
+    Variants are keyed by a digest of the source file (path, mtime, size) and the generation
+    settings, so a changed image or setting produces new files; prune() removes unused ones.
+    """
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, directory: str, widths: Iterable[int], quality: int):
+        self.directory = directory
+        self.widths = tuple(sorted(widths))
+        self.quality = quality
+        self._lock = Lock()
+        self._items: Dict[str, Dict[str, Any]] = {}
+
+    def key(self, path: str, mtime: float, size: int, formats: Tuple[str, ...]) -> str:
+        parts = (path, mtime, size, self.widths, formats, self.quality)
+        return hashlib.sha1("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+
+    def load(self) -> None:
+        """Read the manifest written by save(); a missing or broken manifest means no variants."""
+        try:
+            with open(os.path.join(self.directory, self.MANIFEST), "r", encoding="utf-8") as f:
+                items = json.load(f).get("items") or {}
+        except (OSError, ValueError, AttributeError):
+            items = {}
+        with self._lock:
+            self._items = items
+
+    def save(self) -> None:
+        """Write the manifest atomically; I/O errors are ignored."""
+        path = os.path.join(self.directory, self.MANIFEST)
+        tmp = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+        with self._lock:
+            payload = json.dumps({"items": self._items})
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """{"width", "height", "variants": {format: [[width, file name], ...]}} or None."""
+        return self._items.get(key)
+
+    def file_path(self, name: str) -> Optional[str]:
+        """Absolute path of a variant file name, or None for names this cache does not produce."""
+        if not _NAME_RE.match(name):
+            return None
+        return os.path.join(self.directory, name[:2], name)
+
+    def generate(self, key: str, path: str, formats: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        """Create variants of image path for key (see key()), unless they exist. Returns the manifest item,
+        or None if the file is not a resizable raster image. Pillow errors are raised to the caller."""
+        item = self.get(key)
+        if item is not None or not formats or Image is None:
+            return item
+        if os.path.splitext(path)[1].lower() not in RASTER_EXTENSIONS:
+            return None
+        with Image.open(path) as im:
+            if getattr(im, "is_animated", False):
+                return None
+            im.load()
+            width, height = im.size
+            has_alpha = "A" in im.getbands() or "transparency" in im.info
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA" if has_alpha else "RGB")
+            variants: Dict[str, List[List[Any]]] = {fmt: [] for fmt in formats}
+            for w in [w for w in self.widths if w < width] + [width]:
+                resized = im if w == width else im.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+                for fmt in formats:
+                    name = f"{key}-{w}.{fmt}"
+                    self._write(resized, fmt, self.file_path(name))
+                    variants[fmt].append([w, name])
+        item = {"width": width, "height": height, "variants": variants}
+        with self._lock:
+            self._items[key] = item
+        return item
+
+    def _write(self, im: Any, fmt: str, path: str) -> None:
+        tmp = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            im.save(tmp, format=fmt.upper(), quality=self.quality)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Forget items not in keep and delete files no remaining item uses. Returns number of files deleted."""
+        keep = set(keep)
+        with self._lock:
+            self._items = {k: v for k, v in self._items.items() if k in keep}
+            used = {
+                name for item in self._items.values() for variants in item["variants"].values() for _w, name in variants
+            }
+        deleted = 0
+        if not os.path.isdir(self.directory):
+            return 0
+        for root, _dirs, files in os.walk(self.directory):
+            for fn in files:
+                if fn == self.MANIFEST or fn in used or fn.endswith(".tmp"):
+                    continue
+                try:
+                    os.remove(os.path.join(root, fn))
+                    deleted += 1
+                except OSError:
+                    pass
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts for the admin page."""
+        with self._lock:
+            return {
+                "images": len(self._items),
+                "files": sum(len(v) for item in self._items.values() for v in item["variants"].values()),
+            }
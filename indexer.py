@@ -1,15 +1,29 @@
-"""Documentation index: scanning, Whoosh search, categories."""
+"""Documentation index: scanning, search, categories."""
 
 from __future__ import annotations
 
 import os
 import re
+import gzip
 import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from threading import Lock, Thread
-from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
+from types import MappingProxyType
+from typing import List, Dict, Any, Iterable, Mapping, Optional, Set, Tuple, TYPE_CHECKING
 
-from plugins.Docs.constants import PLUGIN_ROOT_DOC_NAMES, DOC_LANG_RE
+from markupsafe import Markup
+
+from plugins.Docs.constants import (
+    PLUGIN_ROOT_DOC_NAMES, DOC_LANG_RE, DEFAULT_INDEX_WORKERS, SEARCH_MAX_RESULTS, SEARCH_PER_PAGE,
+    SEARCH_MAX_PER_PAGE, SUGGEST_LIMIT, SUGGEST_MAX_HEADINGS, SUGGEST_MAX_LIMIT,
+)
+from plugins.Docs.inverted_index import InvertedIndex
+from plugins.Docs.markdown_processor import extract_headings, extract_image_refs
+from plugins.Docs.search_backends import doc_key, substring_snippet
+from plugins.Docs.suggest_index import SuggestIndex
+from plugins.Docs.render_cache import CONTENT_ENCODINGS
 
 if TYPE_CHECKING:
     from plugins.Docs import Docs  # noqa: F401
@@ -72,249 +86,570 @@ def filter_index_by_locale(entries: List[Dict[str, Any]], locale: str) -> List[D
     return list(by_key.values())
 
 
-def get_doc_entry(docs_index: List[Dict], source_id: str, path: str) -> Optional[Dict[str, Any]]:
-    """Return index entry for (source_id, path) or None."""
-    path_norm = os.path.normpath(path).replace("\\", "/")
-    for entry in docs_index:
-        if entry["source_id"] == source_id and entry["path"].replace("\\", "/") == path_norm:
-            return entry
-    return None
+MANIFEST_FILENAME = "index_manifest.json"
 
 
-def build_docs_index(plugin: "Docs") -> None:
-    """Scan all doc sources and fill plugin._docs_index. Clears HTML cache."""
-    plugin._set_index_progress(
-        status="running", phase="scan", processed=0, total=None, message="Scanning documentation..."
-    )
-    plugin._html_cache.clear()
-    plugin._category_docs_cache.clear()
-    index: List[Dict[str, Any]] = []
-    scanned = 0
+def file_content_hash(file_path: str) -> str:
+    """Return sha1 hex digest of file content."""
+    h = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest() -> Dict[str, Dict[str, Any]]:
+    """Load persisted manifest: file_path -> {source_id, path, mtime, size, hash}."""
+    from app.core.lib.cache import existInCache, getFullFilename
+    try:
+        if not existInCache(MANIFEST_FILENAME, directory="Docs"):
+            return {}
+        with open(getFullFilename(MANIFEST_FILENAME, directory="Docs"), "rb") as f:
+            data = json.loads(f.read().decode("utf-8"))
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def save_manifest(manifest: Dict[str, Dict[str, Any]]) -> None:
+    """Persist manifest to the Docs cache directory."""
+    from app.core.lib.cache import saveToCache
+    try:
+        saveToCache(MANIFEST_FILENAME, json.dumps(manifest).encode("utf-8"), directory="Docs")
+    except Exception:
+        pass
+
 
-    core_docs = os.path.join(plugin.project_root, "docs")
-    if os.path.isdir(core_docs):
-        for root, _dirs, files in os.walk(core_docs):
+VIEWS_FILENAME = "doc_views.json"
+
+
+def load_view_counts() -> Dict[Tuple[str, str, str], int]:
+    """Load persisted view counters: (source_id, path, locale) -> views."""
+    from app.core.lib.cache import existInCache, getFullFilename
+    try:
+        if not existInCache(VIEWS_FILENAME, directory="Docs"):
+            return {}
+        with open(getFullFilename(VIEWS_FILENAME, directory="Docs"), "rb") as f:
+            rows = json.loads(f.read().decode("utf-8"))
+        return {(sid, path, locale): int(n) for sid, path, locale, n in rows}
+    except Exception:
+        return {}
+
+
+def save_view_counts(counts: Dict[Tuple[str, str, str], int]) -> None:
+    """Persist view counters to the Docs cache directory."""
+    from app.core.lib.cache import saveToCache
+    rows = [[sid, path, locale, n] for (sid, path, locale), n in counts.items()]
+    try:
+        saveToCache(VIEWS_FILENAME, json.dumps(rows).encode("utf-8"), directory="Docs")
+    except Exception:
+        pass
+
+
+def list_doc_sources(plugin: "Docs") -> List[str]:
+    """Return source ids in index order: core first, then enabled plugins."""
+    return ["core"] + [name for name in plugin._discover_plugin_names() if name != "core"]
+
+
+def scan_doc_source(plugin: "Docs", source_id: str) -> List[Tuple[str, str, str]]:
+    """Return (source_id, rel_path, file_path) for every doc file of one source, in walk order."""
+    if source_id == "core":
+        plugin_path = None
+        docs_root = os.path.join(plugin.project_root, "docs")
+    else:
+        plugin_path = os.path.join(plugin.plugins_dir, source_id)
+        docs_root = os.path.join(plugin_path, "docs")
+    out: List[Tuple[str, str, str]] = []
+    if os.path.isdir(docs_root):
+        for root, _dirs, files in os.walk(docs_root):
             for name in files:
                 if not name.lower().endswith(".md"):
                     continue
                 full = os.path.join(root, name)
-                if not os.path.isfile(full):
-                    continue
-                rel = os.path.relpath(full, core_docs).replace("\\", "/")
-                base_name, lang = parse_doc_lang(rel)
-                default_title = base_name.replace("_", " ")
-                title, excerpt = extract_title_and_excerpt(full, default_title)
-                index.append({
-                    "source_id": "core",
-                    "path": rel,
-                    "base_name": base_name,
-                    "lang": lang,
-                    "title": title,
-                    "file_path": full,
-                    "excerpt": excerpt,
-                })
-                scanned += 1
-                if scanned % 25 == 0:
-                    plugin._set_index_progress(
-                        status="running", phase="scan", processed=scanned, total=None,
-                        message=f"Scanning... {scanned} docs",
-                    )
-
-    for plugin_name in plugin._discover_plugin_names():
-        plugin_path = os.path.join(plugin.plugins_dir, plugin_name)
-        plugin_docs = os.path.join(plugin_path, "docs")
-        if os.path.isdir(plugin_docs):
-            for root, _dirs, files in os.walk(plugin_docs):
-                for name in files:
-                    if not name.lower().endswith(".md"):
-                        continue
-                    full = os.path.join(root, name)
-                    if not os.path.isfile(full):
-                        continue
-                    rel = os.path.relpath(full, plugin_docs).replace("\\", "/")
-                    base_name, lang = parse_doc_lang(rel)
-                    default_title = base_name.replace("_", " ")
-                    title, excerpt = extract_title_and_excerpt(full, default_title)
-                    index.append({
-                        "source_id": plugin_name,
-                        "path": rel,
-                        "base_name": base_name,
-                        "lang": lang,
-                        "title": title,
-                        "file_path": full,
-                        "excerpt": excerpt,
-                    })
-                    scanned += 1
-                    if scanned % 25 == 0:
-                        plugin._set_index_progress(
-                            status="running", phase="scan", processed=scanned, total=None,
-                            message=f"Scanning... {scanned} docs",
-                        )
+                if os.path.isfile(full):
+                    out.append((source_id, os.path.relpath(full, docs_root).replace("\\", "/"), full))
+    if plugin_path:
         for doc_name in PLUGIN_ROOT_DOC_NAMES:
             full = os.path.join(plugin_path, doc_name)
             if os.path.isfile(full):
-                base_name, lang = parse_doc_lang(doc_name)
-                default_title = base_name.replace("_", " ")
-                title, excerpt = extract_title_and_excerpt(full, default_title)
-                index.append({
-                    "source_id": plugin_name,
-                    "path": doc_name,
-                    "base_name": base_name,
-                    "lang": lang,
-                    "title": title,
-                    "file_path": full,
-                    "excerpt": excerpt,
-                })
-                scanned += 1
-                if scanned % 25 == 0:
-                    plugin._set_index_progress(
-                        status="running", phase="scan", processed=scanned, total=None,
-                        message=f"Scanning... {scanned} docs",
-                    )
+                out.append((source_id, doc_name, full))
+    return out
+
 
+def get_index_workers(plugin: "Docs") -> int:
+    """Number of index worker threads (plugin setting "index_workers"), at least 1."""
+    return plugin._get_int_setting("index_workers", DEFAULT_INDEX_WORKERS)
+
+
+def make_doc_entry(source_id: str, rel: str, full: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse one doc file into an index entry. record is its manifest record."""
+    base_name, lang = parse_doc_lang(rel)
+    default_title = base_name.replace("_", " ")
+    title, excerpt = extract_title_and_excerpt(full, default_title)
+    body = read_doc_text(full)
+    headings = [[text, anchor] for level, text, anchor in extract_headings(body) if level <= 3 and text != title]
+    return {
+        "source_id": source_id,
+        "path": rel,
+        "base_name": base_name,
+        "lang": lang,
+        "title": title,
+        "file_path": full,
+        "excerpt": excerpt,
+        # [text, anchor] of the doc's level 1-3 headings, for search suggestions
+        "headings": headings[:SUGGEST_MAX_HEADINGS],
+        # Image URLs as written in the doc; their versions are part of its render cache keys and ETags
+        "image_refs": sorted(set(extract_image_refs(body))),
+        "mtime": record["mtime"],
+        "size": record["size"],
+        "content_hash": record["hash"],
+    }
+
+
+def set_docs_index(plugin: "Docs", index: List[Dict[str, Any]]) -> None:
+    """Publish index entries and rebuild the lookup structures derived from them."""
     plugin._docs_index = index
     plugin._doc_entry_map = {
         (entry["source_id"], entry["path"].replace("\\", "/")): entry
         for entry in plugin._docs_index
     }
+    # Links written from a plugin root (docs/Name.md) address docs indexed relative to docs/
+    plugin._doc_alias_map = {
+        (sid, "docs/" + path): entry
+        for (sid, path), entry in plugin._doc_entry_map.items()
+        if (sid, "docs/" + path) not in plugin._doc_entry_map
+    }
+    plugin._doc_entry_misses = set()
+    # Identifies index content for HTTP validators (ETag / Last-Modified); stable across workers and restarts
+    plugin._index_generation = hashlib.sha1(
+        "\n".join(
+            sorted(f"{e['source_id']}:{e['path']}:{e.get('content_hash') or e.get('mtime')}" for e in index)
+        ).encode("utf-8")
+    ).hexdigest()
+    plugin._index_last_modified = max((e.get("mtime") or 0 for e in index), default=0) or None
+    # Asset files are resolved again after a rebuild (sources may have moved or been added)
+    plugin._asset_cache = {}
+    plugin._search_cache.clear()
+    plugin._discard_search_responses()
+    plugin._suggest_index = SuggestIndex.build(index)
     docs_by_source: Dict[str, List[Dict[str, Any]]] = {}
     for entry in plugin._docs_index:
         docs_by_source.setdefault(entry["source_id"], []).append(entry)
     plugin._docs_by_source = docs_by_source
+    # Rendered links depend on which docs exist, not on their content
+    plugin._doc_paths_hash = hashlib.sha1(
+        "\n".join(sorted(f"{sid}:{path}" for sid, path in plugin._doc_entry_map)).encode("utf-8")
+    ).hexdigest()
+    # Sidebar trees, their HTML and suggestion filters are derived from the index lazily per locale.
+    # They are replaced last: readers take the cache before reading the index, so anything built
+    # from the previous index can only be stored in a cache that is already replaced.
+    plugin._category_tree_cache = {}
+    plugin._sidebar_html_cache = {}
+    plugin._suggest_visible = {}
+
+
+SNAPSHOT_FILENAME = "index_snapshot.json.gz"
+SNAPSHOT_VERSION = 4
+SNAPSHOT_FIELDS = (
+    "source_id", "path", "base_name", "lang", "title", "file_path", "excerpt", "headings", "image_refs", "mtime",
+    "size", "content_hash",
+)
+
+
+def save_index_snapshot(plugin: "Docs") -> None:
+    """Persist _docs_index and build time as gzipped JSON rows to the Docs cache directory."""
+    from app.core.lib.cache import saveToCache
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "built_at": plugin._index_built_at.isoformat() if plugin._index_built_at else None,
+        "fields": SNAPSHOT_FIELDS,
+        "entries": [[e.get(f) for f in SNAPSHOT_FIELDS] for e in plugin._docs_index],
+    }
+    try:
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        saveToCache(SNAPSHOT_FILENAME, gzip.compress(data, compresslevel=6), directory="Docs")
+    except Exception as ex:
+        plugin.logger.debug("Docs index snapshot not saved: %s", ex)
+
+
+def load_index_snapshot(plugin: "Docs") -> bool:
+    """Load the persisted index snapshot into plugin. Returns True if entries were loaded.
+
+    The snapshot is not validated against the filesystem here; the background rebuild that
+    follows does that cheaply via the manifest.
+    """
+    from app.core.lib.cache import existInCache, getFullFilename
+    try:
+        if not existInCache(SNAPSHOT_FILENAME, directory="Docs"):
+            return False
+        with open(getFullFilename(SNAPSHOT_FILENAME, directory="Docs"), "rb") as f:
+            payload = json.loads(gzip.decompress(f.read()).decode("utf-8"))
+        if payload.get("version") != SNAPSHOT_VERSION or tuple(payload.get("fields") or ()) != SNAPSHOT_FIELDS:
+            return False
+        index = [dict(zip(SNAPSHOT_FIELDS, row)) for row in payload.get("entries") or []]
+        if not index:
+            return False
+        built_at = payload.get("built_at")
+        set_docs_index(plugin, index)
+        plugin._index_built_at = datetime.fromisoformat(built_at) if built_at else None
+        return True
+    except Exception as ex:
+        plugin.logger.debug("Docs index snapshot not loaded: %s", ex)
+        return False
+
+
+def build_docs_index(plugin: "Docs") -> None:
+    """Scan all doc sources and fill plugin._docs_index.
+
+    Files whose mtime/size (or, failing that, content hash) match the persisted manifest keep
+    their existing entry; only added, changed and removed docs are re-parsed, re-indexed in
+    the search index and evicted from the HTML cache.
+    """
+    plugin._cancel_prewarm()
     plugin._set_index_progress(
-        status="running", phase="whoosh", processed=0, total=len(plugin._docs_index),
-        message="Building search index (Whoosh)...",
+        status="running", phase="scan", processed=0, total=None, message="Scanning documentation..."
     )
-    build_whoosh_index(plugin)
+    old_manifest = load_manifest()
+    previous = dict(plugin._doc_entry_map)
+    manifest: Dict[str, Dict[str, Any]] = {}
+    index: List[Dict[str, Any]] = []
+    changed: Set[Tuple[str, str]] = set()
+
+    def index_file(source_id: str, rel: str, full: str):
+        try:
+            st = os.stat(full)
+        except OSError:
+            return None
+        old = old_manifest.get(full)
+        if old and (old.get("source_id"), old.get("path")) != (source_id, rel):
+            old = None
+        same_stat = bool(old) and old.get("mtime") == st.st_mtime and old.get("size") == st.st_size
+        content_hash = old.get("hash") if same_stat else None
+        if content_hash is None:
+            try:
+                content_hash = file_content_hash(full)
+            except OSError:
+                return None
+        record = {
+            "source_id": source_id,
+            "path": rel,
+            "mtime": st.st_mtime,
+            "size": st.st_size,
+            "hash": content_hash,
+        }
+        unchanged = bool(old) and old.get("hash") == content_hash
+        prev_entry = previous.get((source_id, rel))
+        if prev_entry and (prev_entry.get("file_path") != full or prev_entry.get("content_hash") != content_hash):
+            # The manifest may have been saved by another worker sharing the cache after an edit
+            # this process has not parsed yet
+            prev_entry = None
+            unchanged = False
+        if unchanged and prev_entry:
+            prev_entry["mtime"] = st.st_mtime
+            return record, prev_entry, False
+        return record, make_doc_entry(source_id, rel, full, record), not unchanged
+
+    workers = get_index_workers(plugin)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="DocsIndex") as pool:
+        # Walk sources concurrently; map() keeps source order
+        scanned = pool.map(lambda sid: scan_doc_source(plugin, sid), list_doc_sources(plugin))
+        doc_files = [f for files in scanned for f in files]
+        total = len(doc_files)
+        plugin._set_index_progress(
+            status="running", phase="scan", processed=0, total=total,
+            message=f"Scanning... 0/{total} docs",
+        )
+        results: List[Any] = [None] * total
+        futures = {pool.submit(index_file, *f): pos for pos, f in enumerate(doc_files)}
+        done = 0
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            done += 1
+            if done % 25 == 0 or done == total:
+                plugin._set_index_progress(
+                    status="running", phase="scan", processed=done, total=total,
+                    message=f"Scanning... {done}/{total} docs",
+                )
+
+    for (source_id, rel, full), result in zip(doc_files, results):
+        if result is None:
+            continue
+        record, entry, is_changed = result
+        manifest[full] = record
+        index.append(entry)
+        if is_changed:
+            changed.add((source_id, rel))
+
+    current = {(e["source_id"], e["path"]) for e in index}
+    removed = {(rec.get("source_id"), rec.get("path")) for rec in old_manifest.values()} - current
+    removed |= set(previous) - current
+
+    plugin._fallback_index = build_fallback_index(plugin, index, changed, removed)
+    set_docs_index(plugin, index)
+    plugin._html_cache.discard_docs(changed | removed)
+
+    synced = True
+    backend = plugin._search_backend
+    if changed or removed or not backend.exists():
+        plugin._set_index_progress(
+            status="running", phase="search", processed=0, total=len(changed),
+            message=f"Updating search index ({backend.label})...",
+        )
+        synced = backend.build(changed, removed)
+        plugin._discard_search_responses()
+    save_manifest(manifest if synced else {})
     plugin._index_built_at = datetime.now()
+    save_index_snapshot(plugin)
+    plugin._disk_render_cache.prune()
+    save_view_counts(plugin._doc_views)
+    build_image_derivatives(plugin)
     plugin._set_index_progress(
         status="done", phase="done", processed=len(plugin._docs_index),
         total=len(plugin._docs_index), message="Index ready.",
     )
-    plugin.logger.info("Docs index built: %s entries", len(plugin._docs_index))
+    plugin._schedule_prewarm()
+    plugin.logger.info(
+        "Docs index built: %s entries (%s changed, %s removed)",
+        len(plugin._docs_index), len(changed), len(removed),
+    )
 
 
-def build_whoosh_index(plugin: "Docs") -> None:
-    """Build Whoosh full-text search index from _docs_index."""
-    from app.core.lib.cache import clearCache
-    try:
-        from whoosh.analysis import LanguageAnalyzer
-        from whoosh.fields import Schema, TEXT, ID
-        from whoosh.index import create_in, exists_in
-    except ImportError:
-        plugin.logger.debug("Whoosh not installed, full-text search disabled")
+def build_image_derivatives(plugin: "Docs") -> None:
+    """Generate resized variants of raster images referenced by indexed docs, and drop variants no doc uses.
+
+    Image references are recorded in index entries when a doc is parsed, so docs are not re-read here.
+    Docs whose images got new variants are evicted from the HTML cache so they render with <picture>.
+    No-op when image variants are off or Pillow is not installed.
+    """
+    formats = plugin._image_formats
+    derivatives = plugin._image_derivatives
+    if not formats:
         return
-    try:
-        schema = Schema(
-            path=ID(stored=True),
-            source_id=ID(stored=True),
-            base_name=ID(stored=True),
-            lang=ID(stored=True),
-            title=TEXT(stored=True),
-            title_ru=TEXT(stored=True, analyzer=LanguageAnalyzer("ru")),
-            content_ru=TEXT(stored=True, analyzer=LanguageAnalyzer("ru")),
-            title_en=TEXT(stored=True, analyzer=LanguageAnalyzer("en")),
-            content_en=TEXT(stored=True, analyzer=LanguageAnalyzer("en")),
-        )
-        os.makedirs(plugin._whoosh_index_dir, exist_ok=True)
-        if exists_in(plugin._whoosh_index_dir):
-            clearCache("Docs/whoosh")
-            os.makedirs(plugin._whoosh_index_dir, exist_ok=True)
-        ix = create_in(plugin._whoosh_index_dir, schema)
-        writer = ix.writer()
-        total = len(plugin._docs_index)
-        done = 0
-        for entry in plugin._docs_index:
-            file_path = entry.get("file_path")
-            if not file_path or not os.path.isfile(file_path):
-                done += 1
+    resolver = plugin._get_link_resolver()
+    # variant key -> (image path, docs referencing it)
+    images: Dict[str, Tuple[str, Set[Tuple[str, str]]]] = {}
+    for entry in plugin._docs_index:
+        source_id, path = entry["source_id"], entry["path"]
+        for url in entry.get("image_refs") or ():
+            target = resolver.resolve_asset_target(source_id, os.path.dirname(path), url)
+            asset = plugin._get_doc_asset(source_id, target) if target else None
+            if asset is None:
                 continue
-            try:
-                with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-                    content = f.read()
-                lang = (entry.get("lang") or "default").lower()
-                is_ru = lang in ("ru", "uk", "be")
-                is_en = lang in ("en",)
-                writer.add_document(
-                    path=entry["path"],
-                    source_id=entry["source_id"],
-                    base_name=entry["base_name"],
-                    lang=lang,
-                    title=entry.get("title", ""),
-                    title_ru=entry.get("title", "") if is_ru or lang == "default" else "",
-                    content_ru=content if is_ru or lang == "default" else "",
-                    title_en=entry.get("title", "") if is_en or lang == "default" else "",
-                    content_en=content if is_en or lang == "default" else "",
+            key = plugin._image_variant_key(asset)
+            images.setdefault(key, (asset["path"], set()))[1].add((source_id, path))
+
+    pending = [key for key in images if derivatives.get(key) is None]
+    plugin._set_index_progress(
+        status="running", phase="images", processed=0, total=len(pending),
+        message=f"Generating image variants... 0/{len(pending)}",
+    )
+
+    def generate(key: str) -> bool:
+        try:
+            return derivatives.generate(key, images[key][0], formats) is not None
+        except Exception as ex:
+            plugin.logger.warning("Docs image variants failed for %s: %s", images[key][0], ex)
+            return False
+
+    refreshed: Set[Tuple[str, str]] = set()
+    generated = 0
+    with ThreadPoolExecutor(max_workers=get_index_workers(plugin), thread_name_prefix="DocsImages") as pool:
+        futures = {pool.submit(generate, key): key for key in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            if future.result():
+                generated += 1
+                refreshed |= images[futures[future]][1]
+            if done % 10 == 0 or done == len(pending):
+                plugin._set_index_progress(
+                    status="running", phase="images", processed=done, total=len(pending),
+                    message=f"Generating image variants... {done}/{len(pending)}",
                 )
-            except Exception as ex:
-                plugin.logger.debug("Whoosh: skip %s: %s", file_path, ex)
-            finally:
-                done += 1
-                if done % 10 == 0 or done == total:
-                    plugin._set_index_progress(
-                        status="running", phase="whoosh", processed=done, total=total,
-                        message=f"Building Whoosh index... {done}/{total}",
-                    )
-        writer.commit()
-        plugin.logger.debug("Whoosh index built in %s", plugin._whoosh_index_dir)
-    except Exception as ex:
-        plugin.logger.warning("Whoosh index build failed: %s", ex)
+    derivatives.prune(images)
+    derivatives.save()
+    plugin._html_cache.discard_docs(refreshed)
+    if generated:
+        plugin.logger.info("Docs image variants: %s images for %s docs", generated, len(refreshed))
+
+
+def doc_key_for_file(plugin: "Docs", full: str) -> Optional[Tuple[str, str]]:
+    """(source_id, rel_path) a doc file would be indexed under (see scan_doc_source), or None."""
+    full = os.path.abspath(full)
+    if not full.lower().endswith(".md"):
+        return None
+    core_docs = os.path.abspath(os.path.join(plugin.project_root, "docs"))
+    if full.startswith(core_docs + os.sep):
+        return "core", os.path.relpath(full, core_docs).replace("\\", "/")
+    plugins_dir = os.path.abspath(plugin.plugins_dir)
+    if not full.startswith(plugins_dir + os.sep):
+        return None
+    parts = os.path.relpath(full, plugins_dir).split(os.sep)
+    if len(parts) == 2 and parts[1] in PLUGIN_ROOT_DOC_NAMES:
+        return parts[0], parts[1]
+    if len(parts) > 2 and parts[1] == "docs":
+        return parts[0], "/".join(parts[2:])
+    return None
 
 
-def search_docs_whoosh(plugin: "Docs", q: str) -> List[Dict[str, Any]]:
-    """Search via Whoosh; return list of entries for filter_index_by_locale."""
-    if not q or not q.strip():
-        return []
-    try:
-        from whoosh.index import exists_in, open_dir
-        from whoosh.qparser import MultifieldParser, OrGroup
-    except ImportError:
-        return []
+def read_doc_text(file_path: Optional[str]) -> str:
+    """Doc file content, or "" if it cannot be read."""
+    if not file_path:
+        return ""
     try:
-        if not exists_in(plugin._whoosh_index_dir):
-            return []
-        ix = open_dir(plugin._whoosh_index_dir)
-        parser = MultifieldParser(
-            ["title_ru", "content_ru", "title_en", "content_en"],
-            schema=ix.schema,
-            group=OrGroup,
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def build_fallback_index(
+    plugin: "Docs",
+    entries: List[Dict[str, Any]],
+    changed: Set[Tuple[str, str]],
+    removed: Set[Tuple[str, str]],
+) -> InvertedIndex:
+    """In-memory BM25 index of doc titles and content, searched when the search backend finds nothing.
+
+    The current index is updated with the changed and removed docs. It is built from all doc files
+    when there is none yet (first build after start) or when replaced docs outnumber live ones.
+    """
+    current = plugin._fallback_index
+    by_key = {(e["source_id"], e["path"]): e for e in entries}
+    if current is None or current.dead > len(current):
+        plugin._set_index_progress(
+            status="running", phase="search", processed=0, total=len(by_key),
+            message="Building fallback search index...",
         )
-        qparsed = parser.parse(q)
-        with ix.searcher() as searcher:
-            results = searcher.search(qparsed, limit=100)
-            out = []
-            for hit in results:
-                snippet = None
-                try:
-                    snippet = (
-                        hit.highlights("content_ru", top=2, minscore=1)
-                        or hit.highlights("content_en", top=2, minscore=1)
-                    )
-                    if snippet:
-                        snippet = snippet.strip()
-                except Exception:
-                    snippet = None
-                out.append({
-                    "source_id": hit["source_id"],
-                    "path": hit["path"],
-                    "base_name": hit["base_name"],
-                    "lang": hit.get("lang", "default"),
-                    "title": hit.get("title", "") or hit.get("title_ru", "") or hit.get("title_en", ""),
-                    "snippet": snippet,
-                })
-            return out
-    except Exception as ex:
-        plugin.logger.debug("Whoosh search failed: %s", ex)
-        return []
+        current, keys = InvertedIndex(), list(by_key)
+    else:
+        keys = [key for key in changed if key in by_key]
+    docs = ((key, by_key[key].get("title") or "", read_doc_text(by_key[key].get("file_path"))) for key in keys)
+    return current.updated(removed, docs)
+
+
+def update_docs_index(plugin: "Docs", files: Iterable[str]) -> None:
+    """Apply added, modified and removed doc files to the index, search index, manifest and caches without
+    scanning the doc sources. Files outside the doc sources are ignored."""
+    manifest = load_manifest()
+    index: List[Optional[Dict[str, Any]]] = list(plugin._docs_index)
+    positions = {(e["source_id"], e["path"]): pos for pos, e in enumerate(index)}
+    sources = set(list_doc_sources(plugin))
+    changed: Set[Tuple[str, str]] = set()
+    removed: Set[Tuple[str, str]] = set()
+    for full in files:
+        key = doc_key_for_file(plugin, full)
+        if key is None or key[0] not in sources:
+            continue
+        full = os.path.abspath(full)
+        pos = positions.get(key)
+        try:
+            st = os.stat(full)
+            content_hash = file_content_hash(full)
+        except OSError:
+            st = None
+        if st is None:
+            if pos is not None and index[pos] is not None:
+                manifest.pop(index[pos]["file_path"], None)
+                index[pos] = None
+                removed.add(key)
+            continue
+        record = {
+            "source_id": key[0],
+            "path": key[1],
+            "mtime": st.st_mtime,
+            "size": st.st_size,
+            "hash": content_hash,
+        }
+        manifest[full] = record
+        entry = index[pos] if pos is not None else None
+        if entry is not None and entry.get("content_hash") == content_hash:
+            entry["mtime"] = st.st_mtime
+            continue
+        entry = make_doc_entry(key[0], key[1], full, record)
+        if pos is None:
+            positions[key] = len(index)
+            index.append(entry)
+        else:
+            index[pos] = entry
+        removed.discard(key)
+        changed.add(key)
+    if not changed and not removed:
+        save_manifest(manifest)
+        return
+
+    paths_hash = plugin._doc_paths_hash
+    entries = [e for e in index if e is not None]
+    plugin._fallback_index = build_fallback_index(plugin, entries, changed, removed)
+    set_docs_index(plugin, entries)
+    if plugin._doc_paths_hash != paths_hash:
+        # Links in other docs may now resolve differently
+        plugin._html_cache.clear()
+    else:
+        plugin._html_cache.discard_docs(changed | removed)
+    backend = plugin._search_backend
+    plugin._set_index_progress(
+        status="running", phase="search", processed=0, total=len(changed),
+        message=f"Updating search index ({backend.label})...",
+    )
+    synced = backend.build(changed, removed)
+    plugin._discard_search_responses()
+    save_manifest(manifest if synced else {})
+    plugin._index_built_at = datetime.now()
+    save_index_snapshot(plugin)
+    build_image_derivatives(plugin)
+    plugin._set_index_progress(
+        status="done", phase="done", processed=len(plugin._docs_index),
+        total=len(plugin._docs_index), message="Index ready.",
+    )
+    plugin.logger.info("Docs index updated: %s changed, %s removed", len(changed), len(removed))
+
+
+class _SearchResults(list):
+    """Cached search results; sized by their text for the cache byte budget."""
+
+    def __sizeof__(self) -> int:
+        return super().__sizeof__() + sum(
+            sum(len(v) for v in r.values() if isinstance(v, str)) + 64 for r in self
+        )
+
+
+class _SearchSnippets(dict):
+    """Cached highlighted snippets by doc key; sized like _SearchResults."""
+
+    def __sizeof__(self) -> int:
+        return super().__sizeof__() + sum(len(k) + len(v) + 64 for k, v in self.items())
+
+
+def normalize_search_query(q: Optional[str]) -> str:
+    """Search query with whitespace collapsed, as used in search cache keys."""
+    return " ".join((q or "").split())
 
 
 def search_docs(
     plugin: "Docs", q: str, locale: Optional[str] = None
 ) -> List[Dict[str, Any]]:
-    """Search via Whoosh or fallback to substring. Locale filter applied."""
+    """Search via the search backend, or the in-memory fallback index if it finds nothing. Locale filter applied.
+
+    Results are cached per (normalized query, locale) until the index or the search index changes;
+    concurrent identical searches run once. Backend hits have an empty snippet; see search_docs_page().
+    """
+    query = normalize_search_query(q)
+    backend = plugin._search_backend
+    key = (plugin._index_generation, backend.name, backend.generation, query, locale or "")
+    return list(plugin._search_cache.get_or_create(key, lambda: _search_docs_uncached(plugin, query, locale)))
+
+
+def _search_docs_uncached(plugin: "Docs", q: str, locale: Optional[str]) -> "_SearchResults":
     from flask import url_for
-    matches = search_docs_whoosh(plugin, q)
-    if not matches and q:
+    # highlight: who makes the snippet, the search backend or get_search_snippets() from the doc text
+    matches = [dict(hit, highlight="backend") for hit in plugin._search_backend.search(q)]
+    if not matches and q and plugin._fallback_index is not None:
+        matches = [
+            dict(plugin._doc_entry_map[key], highlight="text")
+            for key, _score in plugin._fallback_index.search(q, SEARCH_MAX_RESULTS)
+            if key in plugin._doc_entry_map
+        ]
+    elif not matches and q:
+        # No fallback index until the first build after start; match titles and excerpts
         q_lower = q.lower()
         matches = [
             e for e in plugin._docs_index
@@ -322,40 +657,102 @@ def search_docs(
         ]
     if locale:
         matches = filter_index_by_locale(matches, locale)
-    return [
+    return _SearchResults(
         {
             "title": e["title"],
             "url": url_for("Docs.docs_home", category=e["source_id"], file=e["path"]),
             "source_id": e["source_id"],
             "path": e["path"],
-            "snippet": e.get("snippet") or e.get("excerpt") or "",
+            "snippet": "" if e.get("highlight") else e.get("excerpt") or "",
+            "highlight": e.get("highlight") or "",
         }
         for e in matches
-    ]
+    )
+
+
+def get_search_snippets(plugin: "Docs", q: str, results: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Snippets {doc key: HTML} for search results; highlighted ones are cached like results.
+
+    Backend hits are highlighted by the search backend. Fallback hits, and backend hits it could not
+    highlight, get an excerpt around the first query word in the doc text, or the doc excerpt.
+    """
+    snippets = {doc_key(r["source_id"], r["path"]): r["snippet"] for r in results}
+    docs = [(r["source_id"], r["path"], r["highlight"]) for r in results if r.get("highlight")]
+    if not docs:
+        return snippets
+    query = normalize_search_query(q)
+    backend = plugin._search_backend
+
+    def highlight() -> _SearchSnippets:
+        found = backend.snippets(query, [(sid, path) for sid, path, how in docs if how == "backend"])
+        words = [w.lower() for w in re.findall(r"\w+", query)]
+        for sid, path, _how in docs:
+            entry = plugin._doc_entry_map.get((sid, path))
+            if doc_key(sid, path) not in found and entry is not None:
+                text = read_doc_text(entry.get("file_path"))
+                found[doc_key(sid, path)] = substring_snippet(text, words) or entry.get("excerpt") or ""
+        return _SearchSnippets(found)
+
+    key = ("snippets", plugin._index_generation, backend.name, backend.generation, query, tuple(docs))
+    snippets.update(plugin._search_cache.get_or_create(key, highlight))
+    return snippets
+
+
+def search_docs_page(
+    plugin: "Docs",
+    q: str,
+    locale: Optional[str] = None,
+    page: int = 1,
+    per_page: int = SEARCH_PER_PAGE,
+    snippets: bool = True,
+) -> Dict[str, Any]:
+    """One page of search_docs() results: {"results", "total", "page", "per_page", "pages"}.
+
+    page is clamped to the available pages. With snippets, only the hits on this page are highlighted;
+    otherwise highlighted hits keep an empty snippet and can be fetched later with get_search_snippets().
+    """
+    results = search_docs(plugin, q, locale)
+    per_page = max(1, min(per_page, SEARCH_MAX_PER_PAGE))
+    pages = max(1, -(-len(results) // per_page))
+    page = max(1, min(page, pages))
+    hits = results[(page - 1) * per_page:page * per_page]
+    if snippets:
+        found = get_search_snippets(plugin, q, hits)
+        hits = [dict(r, snippet=found.get(doc_key(r["source_id"], r["path"]), "")) for r in hits]
+    return {"results": hits, "total": len(results), "page": page, "per_page": per_page, "pages": pages}
+
+
+def suggest_docs(
+    plugin: "Docs", q: str, locale: Optional[str] = None, limit: int = SUGGEST_LIMIT
+) -> List[Dict[str, Any]]:
+    """Search-as-you-type completions of q: [{"text", "kind", "url"}], url only for titles and headings.
+
+    Only docs shown for locale are suggested (see filter_index_by_locale()); the set of them is
+    remembered per locale until the index changes.
+    """
+    from flask import url_for
+    limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+    visible = None
+    if locale:
+        cache = plugin._suggest_visible
+        visible = cache.get(locale)
+        if visible is None:
+            visible = frozenset(
+                (e["source_id"], e["path"]) for e in filter_index_by_locale(plugin._docs_index, locale)
+            )
+            cache[locale] = visible
+    suggestions = []
+    for text, kind, key, anchor in plugin._suggest_index.complete(q, limit, visible):
+        item = {"text": text, "kind": kind}
+        if key is not None:
+            url = url_for("Docs.docs_home", category=key[0], file=key[1])
+            item["url"] = f"{url}#{anchor}" if anchor else url
+        suggestions.append(item)
+    return suggestions
 
 
 def get_index_info(plugin: "Docs") -> Dict[str, Any]:
     """Return diagnostic info for admin page."""
-    whoosh_installed = False
-    whoosh_ready = False
-    whoosh_error = None
-    whoosh_files = 0
-    whoosh_bytes = 0
-    try:
-        from whoosh.index import exists_in  # type: ignore
-        whoosh_installed = True
-        whoosh_ready = os.path.isdir(plugin._whoosh_index_dir) and exists_in(plugin._whoosh_index_dir)
-        if os.path.isdir(plugin._whoosh_index_dir):
-            for root, _dirs, files in os.walk(plugin._whoosh_index_dir):
-                for fn in files:
-                    whoosh_files += 1
-                    try:
-                        whoosh_bytes += os.path.getsize(os.path.join(root, fn))
-                    except OSError:
-                        pass
-    except Exception as ex:
-        whoosh_error = str(ex)
-
     built_at = plugin._index_built_at.isoformat(sep=" ", timespec="seconds") if plugin._index_built_at else None
     docs_by_source: Dict[str, int] = {}
     for e in plugin._docs_index:
@@ -366,14 +763,18 @@ def get_index_info(plugin: "Docs") -> Dict[str, Any]:
         "docs_count": len(plugin._docs_index),
         "docs_by_source": docs_by_source,
         "built_at": built_at,
-        "whoosh": {
-            "installed": whoosh_installed,
-            "ready": whoosh_ready,
-            "dir": plugin._whoosh_index_dir,
-            "files": whoosh_files,
-            "bytes": whoosh_bytes,
-            "error": whoosh_error,
-        },
+        "render_cache": plugin._html_cache.stats(),
+        "disk_cache": plugin._disk_render_cache.stats(),
+        "search_cache": plugin._search_cache.stats(),
+        "image_variants": dict(plugin._image_derivatives.stats(), formats=list(plugin._image_formats)),
+        "compressed_cache": dict(
+            plugin._compressed_cache.stats(),
+            enabled=plugin._compressed_cache_enabled,
+            encodings=list(CONTENT_ENCODINGS),
+        ),
+        "search": plugin._search_backend.info(),
+        "fallback": plugin._fallback_index.stats() if plugin._fallback_index is not None else None,
+        "suggest": plugin._suggest_index.stats(),
     }
 
 
@@ -393,30 +794,59 @@ def get_home_categories(plugin: "Docs") -> List[Dict[str, Any]]:
     return categories
 
 
+def get_category_tree(plugin: "Docs", locale: str) -> Tuple[Mapping[str, Any], ...]:
+    """Return sidebar categories with their documents for a locale, read-only.
+
+    Built once per index generation and locale (set_docs_index resets it) and shared by all
+    requests. Categories and documents are mapping proxies in tuples; callers must copy to modify.
+    """
+    from flask import url_for
+    locale_key = (locale or "en").lower()[:2]
+    cache = plugin._category_tree_cache
+    tree = cache.get(locale_key)
+    if tree is not None:
+        return tree
+    categories = []
+    for cat in get_home_categories(plugin):
+        filtered = filter_index_by_locale(plugin._docs_by_source.get(cat["source_id"], []), locale_key)
+        documents = [
+            MappingProxyType({
+                "title": e["title"],
+                "path": e["path"],
+                "excerpt": (e.get("excerpt") or "").strip()[:300],
+                "home_url": url_for("Docs.docs_home", category=e["source_id"], file=e["path"]),
+            })
+            for e in filtered
+        ]
+        documents.sort(key=lambda x: x["title"].lower())
+        categories.append(MappingProxyType(dict(cat, documents=tuple(documents))))
+    tree = tuple(categories)
+    cache[locale_key] = tree
+    return tree
+
+
+def get_sidebar_html(plugin: "Docs", locale: str, variant: str) -> Markup:
+    """Rendered sidebar category tree ("home" or "search" variant), cached like get_category_tree."""
+    from flask import render_template
+    key = ((locale or "en").lower()[:2], variant)
+    cache = plugin._sidebar_html_cache
+    html = cache.get(key)
+    if html is None:
+        html = Markup(render_template(
+            "docs/_sidebar_tree.html", tree=get_category_tree(plugin, locale), variant=variant
+        ))
+        cache[key] = html
+    return html
+
+
 def get_documents_for_category(
     plugin: "Docs", source_id: str, locale: str
 ) -> List[Dict[str, Any]]:
     """Return docs for one category, filtered by locale."""
-    from flask import url_for
-    locale_key = (locale or "en").lower()[:2]
-    cache_key = (source_id, locale_key)
-    cached = plugin._category_docs_cache.get(cache_key)
-    if cached is not None:
-        return [dict(item) for item in cached]
-
-    entries = plugin._docs_by_source.get(source_id, [])
-    filtered = filter_index_by_locale(entries, locale)
-    out = []
-    for e in filtered:
-        out.append({
-            "title": e["title"],
-            "path": e["path"],
-            "excerpt": (e.get("excerpt") or "").strip()[:300],
-            "home_url": url_for("Docs.docs_home", category=e["source_id"], file=e["path"]),
-        })
-    out.sort(key=lambda x: x["title"].lower())
-    plugin._category_docs_cache[cache_key] = [dict(item) for item in out]
-    return out
+    for cat in get_category_tree(plugin, locale):
+        if cat["source_id"] == source_id:
+            return [dict(item) for item in cat["documents"]]
+    return []
 
 
 def build_home_sections(plugin: "Docs", locale: str) -> List[Dict[str, Any]]:
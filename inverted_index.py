@@ -0,0 +1,137 @@
+"""In-memory inverted index with BM25 ranking: the search fallback when no search engine is available
+or it finds nothing."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from math import log
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from plugins.Docs.analyzers import simple_terms
+
+# BM25 parameters, weight of title words against content words, and of prefix matches against whole words
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 5
+PREFIX_WEIGHT = 0.5
+# Query words this long also match longer words starting with them (up to PREFIX_EXPANSIONS of them)
+PREFIX_MIN_LENGTH = 3
+PREFIX_EXPANSIONS = 50
+
+_MAX_TF = 0xFFFF
+
+
+class InvertedIndex:
+    """Term -> postings index of documents keyed by any hashable key.
+
+    Postings are parallel arrays of document numbers ("I") and term frequencies ("H"). The index
+    is never modified in place: updated() returns a new index that shares unchanged postings, so
+    searches can keep using the old one meanwhile. Replaced and removed documents stay in the
+    postings as dead numbers until a rebuild drops them.
+    """
+
+    def __init__(self):
+        self._keys: List[Optional[Hashable]] = []
+        self._lengths = array("I")
+        self._numbers: Dict[Hashable, int] = {}
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._terms: List[str] = []
+        self._total_length = 0
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[Hashable, str, str]]) -> "InvertedIndex":
+        """Index (key, title, content) documents."""
+        return cls().updated((), docs)
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    @property
+    def dead(self) -> int:
+        """Document numbers that are no longer live (rebuild when this grows large)."""
+        return len(self._keys) - len(self._numbers)
+
+    def updated(
+        self, removed: Iterable[Hashable], docs: Iterable[Tuple[Hashable, str, str]]
+    ) -> "InvertedIndex":
+        """New index without the removed keys and with docs (key, title, content) added or replaced."""
+        new = InvertedIndex()
+        new._keys = list(self._keys)
+        new._lengths = array("I", self._lengths)
+        new._numbers = dict(self._numbers)
+        new._total_length = self._total_length
+        postings = dict(self._postings)
+        added: Dict[str, Tuple[array, array]] = {}
+        for key in removed:
+            new._drop(key)
+        for key, title, content in docs:
+            new._drop(key)
+            counts = Counter(simple_terms(content))
+            for term in simple_terms(title):
+                counts[term] += TITLE_WEIGHT
+            number = len(new._keys)
+            new._keys.append(key)
+            new._numbers[key] = number
+            length = sum(counts.values())
+            new._lengths.append(length)
+            new._total_length += length
+            for term, tf in counts.items():
+                if term not in added:
+                    # Copy on first write; the old index keeps its arrays
+                    old = postings.get(term)
+                    added[term] = (array("I", old[0]), array("H", old[1])) if old else (array("I"), array("H"))
+                numbers, tfs = added[term]
+                numbers.append(number)
+                tfs.append(min(tf, _MAX_TF))
+        postings.update(added)
+        new._postings = postings
+        new._terms = sorted(postings) if added or not self._terms else self._terms
+        return new
+
+    def _drop(self, key: Hashable) -> None:
+        number = self._numbers.pop(key, None)
+        if number is not None:
+            self._keys[number] = None
+            self._total_length -= self._lengths[number]
+
+    def search(self, q: str, limit: int) -> List[Tuple[Hashable, float]]:
+        """(key, BM25 score) of the best matching documents, best first. Query words are OR-ed."""
+        if not self._numbers:
+            return []
+        doc_count = len(self._numbers)
+        average = self._total_length / doc_count or 1.0
+        scores: Dict[int, float] = {}
+        for word in dict.fromkeys(simple_terms(q)):
+            for term, weight in self._expand(word):
+                numbers, tfs = self._postings[term]
+                live = [(n, tf) for n, tf in zip(numbers, tfs) if self._keys[n] is not None]
+                if not live:
+                    continue
+                idf = log(1.0 + (doc_count - len(live) + 0.5) / (len(live) + 0.5))
+                for n, tf in live:
+                    norm = tf + BM25_K1 * (1.0 - BM25_B + BM25_B * self._lengths[n] / average)
+                    scores[n] = scores.get(n, 0.0) + weight * idf * tf * (BM25_K1 + 1.0) / norm
+        best = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return [(self._keys[n], score) for n, score in best]
+
+    def _expand(self, word: str) -> List[Tuple[str, float]]:
+        """Index terms matching a query word: the word itself, and longer words it is a prefix of."""
+        terms = [(word, 1.0)] if word in self._postings else []
+        if len(word) >= PREFIX_MIN_LENGTH:
+            i = bisect_left(self._terms, word)
+            while i < len(self._terms) and len(terms) <= PREFIX_EXPANSIONS and self._terms[i].startswith(word):
+                if self._terms[i] != word:
+                    terms.append((self._terms[i], PREFIX_WEIGHT))
+                i += 1
+        return terms
+
+    def stats(self) -> Dict[str, int]:
+        """Counts for the admin page."""
+        return {
+            "docs": len(self._numbers),
+            "dead": self.dead,
+            "terms": len(self._postings),
+            "postings": sum(len(numbers) for numbers, _tfs in self._postings.values()),
+        }
@@ -3,7 +3,7 @@
 import os
 import re
 from html import unescape
-from typing import Optional, Callable
+from typing import Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
 from plugins.Docs.constants import DOC_ASSET_EXTENSIONS
@@ -21,6 +21,33 @@ def process_jekyll_links(text: str) -> str:
     return re.sub(r'\]\(\{%\s*link\s+([^\s}]+)\s*%\}\)', replace_jekyll_link, text)
 
 
+_FENCE_OPEN_RE = re.compile(r"^[ \t]*(?:>[ \t]*)*(`{3,}(?=[^`\n]*$)|~{3,})", re.MULTILINE)
+
+
+def split_markdown_code(text: str) -> List[Tuple[bool, str]]:
+    """Split markdown into (is_code, segment) parts; fenced code blocks (``` or ~~~,
+    also inside lists and quotes) are code.
+    A fence closes on a line of the same character at least as long; an unclosed fence runs to the end."""
+    parts: List[Tuple[bool, str]] = []
+    pos = 0
+    while True:
+        m = _FENCE_OPEN_RE.search(text, pos)
+        if not m:
+            break
+        fence = m.group(1)
+        close_re = re.compile(r"^[ \t]*(?:>[ \t]*)*" + re.escape(fence[0]) + "{%d,}[ \t]*$" % len(fence), re.MULTILINE)
+        line_end = text.find("\n", m.end())
+        close = close_re.search(text, line_end + 1) if line_end != -1 else None
+        end = len(text) if close is None else close.end()
+        if m.start() > pos:
+            parts.append((False, text[pos:m.start()]))
+        parts.append((True, text[m.start():end]))
+        pos = end
+    if pos < len(text):
+        parts.append((False, text[pos:]))
+    return parts
+
+
 def process_mermaid_blocks(html: str) -> str:
     """Process mermaid code blocks and convert to div.mermaid.
     Handles: <pre><code class="language-mermaid">, <pre><code class="mermaid">,
@@ -60,67 +87,73 @@ _ALERT_ICONS = {
 }
 
 
+_ALERT_RE = re.compile(r"<blockquote>\s*(.*?)\s*</blockquote>", re.DOTALL)
+
+
+def _render_alert(content: str, tr: Callable[[str], str]) -> Optional[str]:
+    """Return alert div for blockquote content with a [!TAG] marker, or None if it is a plain quote."""
+    for tag, (css_class, title_key) in _ALERT_TYPES.items():
+        if tag in content:
+            body = re.sub(re.escape(tag) + r"\s*", "", content, count=1)
+            body = re.sub(r"<p>\s*</p>\s*", "", body)
+            body = body.strip()
+            icon_class = _ALERT_ICONS.get(tag, "fas fa-info-circle")
+            icon_html = f'<i class="{icon_class}" aria-hidden="true"></i>'
+            title = tr(title_key)
+            header = f'<div class="docs-alert-title"><span class="docs-alert-icon">{icon_html}</span><span class="docs-alert-title-text">{title}</span></div>'
+            return f'<div class="docs-alert {css_class}">{header}<div class="docs-alert-body">{body}</div></div>'
+    return None
+
+
 def process_github_alerts(html: str, translate: Optional[Callable[[str], str]] = None) -> str:
     """Convert blockquotes with [!NOTE], [!TIP], etc. to styled alert divs.
     translate: optional callback(title_key) -> translated string for alert titles."""
     tr = translate if callable(translate) else (lambda s: s)
 
     def replace_alert(match):
-        full = match.group(0)
-        content = match.group(1)
-        for tag, (css_class, title_key) in _ALERT_TYPES.items():
-            if tag in content:
-                body = re.sub(re.escape(tag) + r"\s*", "", content, count=1)
-                body = re.sub(r"<p>\s*</p>\s*", "", body)
-                body = body.strip()
-                icon_class = _ALERT_ICONS.get(tag, "fas fa-info-circle")
-                icon_html = f'<i class="{icon_class}" aria-hidden="true"></i>'
-                title = tr(title_key)
-                header = f'<div class="docs-alert-title"><span class="docs-alert-icon">{icon_html}</span><span class="docs-alert-title-text">{title}</span></div>'
-                return f'<div class="docs-alert {css_class}">{header}<div class="docs-alert-body">{body}</div></div>'
-        return full
+        alert = _render_alert(match.group(1), tr)
+        return alert if alert is not None else match.group(0)
 
-    return re.sub(
-        r"<blockquote>\s*(.*?)\s*</blockquote>",
-        replace_alert,
-        html,
-        flags=re.DOTALL,
-    )
+    return _ALERT_RE.sub(replace_alert, html)
+
+
+_SWATCH_RE = re.compile(r'<code(\s[^>]*)?>([^<]+)</code>')
+_HEX_COLOR_RE = re.compile(r'^#([0-9a-fA-F]{3}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$')
+_RGB_COLOR_RE = re.compile(r'^rgba?\s*\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)(?:\s*,\s*[\d.]+)?\s*\)$')
+_HSL_COLOR_RE = re.compile(r'^hsla?\s*\(\s*(\d+)\s*,\s*(\d+)%\s*,\s*(\d+)%(?:\s*,\s*[\d.]+)?\s*\)$')
+
+
+def _render_swatch(attrs: str, raw_content: str) -> Optional[str]:
+    """Return inline code wrapped with a color swatch, or None if content is not a color."""
+    content = raw_content.strip()
+    # Skip if code has language class (from fenced blocks)
+    if 'class=' in attrs and 'language-' in attrs:
+        return None
+    # HEX: #RGB, #RRGGBB, #RRGGBBAA
+    if _HEX_COLOR_RE.match(content):
+        css_color = content
+        return f'<span class="docs-color-inline"><span class="docs-color-swatch" style="background-color: {css_color}" aria-hidden="true"></span><code{attrs}>{content}</code></span>'
+    # RGB/RGBA
+    rgb_m = _RGB_COLOR_RE.match(content)
+    if rgb_m:
+        r, g, b = int(rgb_m.group(1)), int(rgb_m.group(2)), int(rgb_m.group(3))
+        if 0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255:
+            return f'<span class="docs-color-inline"><span class="docs-color-swatch" style="background-color: {content}" aria-hidden="true"></span><code{attrs}>{content}</code></span>'
+    # HSL/HSLA
+    if _HSL_COLOR_RE.match(content):
+        return f'<span class="docs-color-inline"><span class="docs-color-swatch" style="background-color: {content}" aria-hidden="true"></span><code{attrs}>{content}</code></span>'
+    return None
 
 
 def process_color_swatches(html: str) -> str:
     """Add color swatches to inline code that contains HEX, RGB, or HSL color values."""
 
     def wrap_with_swatch(match):
-        full = match.group(0)
-        attrs = match.group(1) or ""
-        content = match.group(2).strip()
-        # Skip if code has language class (from fenced blocks)
-        if 'class=' in attrs and 'language-' in attrs:
-            return full
-        # HEX: #RGB, #RRGGBB, #RRGGBBAA
-        hex_m = re.match(r'^#([0-9a-fA-F]{3}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$', content)
-        if hex_m:
-            css_color = content
-            return f'<span class="docs-color-inline"><span class="docs-color-swatch" style="background-color: {css_color}" aria-hidden="true"></span><code{attrs}>{content}</code></span>'
-        # RGB/RGBA
-        rgb_m = re.match(r'^rgba?\s*\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)(?:\s*,\s*[\d.]+)?\s*\)$', content)
-        if rgb_m:
-            r, g, b = int(rgb_m.group(1)), int(rgb_m.group(2)), int(rgb_m.group(3))
-            if 0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255:
-                return f'<span class="docs-color-inline"><span class="docs-color-swatch" style="background-color: {content}" aria-hidden="true"></span><code{attrs}>{content}</code></span>'
-        # HSL/HSLA
-        hsl_m = re.match(r'^hsla?\s*\(\s*(\d+)\s*,\s*(\d+)%\s*,\s*(\d+)%(?:\s*,\s*[\d.]+)?\s*\)$', content)
-        if hsl_m:
-            return f'<span class="docs-color-inline"><span class="docs-color-swatch" style="background-color: {content}" aria-hidden="true"></span><code{attrs}>{content}</code></span>'
-        return full
+        swatch = _render_swatch(match.group(1) or "", match.group(2))
+        return swatch if swatch is not None else match.group(0)
 
     # Match <code> or <code attr="..."> - content must be exactly a color
-    return re.sub(
-        r'<code(\s[^>]*)?>([^<]+)</code>',
-        wrap_with_swatch,
-        html,
-    )
+    return _SWATCH_RE.sub(wrap_with_swatch, html)
 
 
 def process_code_blocks_for_prism(html: str) -> str:
@@ -138,16 +171,111 @@ def process_code_blocks_for_prism(html: str) -> str:
     )
 
 
+_HEADING_RE = re.compile(r"<h([1-6])(\s[^>]*)?>(.*?)</h\1>", re.DOTALL | re.IGNORECASE)
+_HEADING_ID_RE = re.compile(r'\sid=["\']([^"\']+)["\']')
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _slugify(text: str) -> str:
+    """Heading anchor slug; mirrors slugify() in templates/docs/_doc_layout.html."""
+    slug = re.sub(r"[\u0300-\u036f]", "", text.strip().lower())
+    slug = re.sub(r"[^a-z0-9\u0400-\u04ff\s_-]", "", slug)
+    slug = re.sub(r"[\s_]+", "-", slug)
+    return re.sub(r"-+", "-", slug).strip("-")
+
+
+def extract_toc(html: str) -> List[Dict[str, object]]:
+    """Outline of rendered HTML: [{level, id, text}] for non-empty headings, ids unique like the page script."""
+    toc: List[Dict[str, object]] = []
+    used = set()
+    for m in _HEADING_RE.finditer(html):
+        text = " ".join(unescape(_TAG_RE.sub("", m.group(3))).split())
+        if not text:
+            continue
+        id_match = _HEADING_ID_RE.search(m.group(2) or "")
+        base = (id_match.group(1) if id_match else _slugify(text)) or "section"
+        anchor, n = base, 2
+        while anchor in used:
+            anchor, n = f"{base}-{n}", n + 1
+        used.add(anchor)
+        toc.append({"level": int(m.group(1)), "id": anchor, "text": text})
+    return toc
+
+
+_MD_HEADING_RE = re.compile(r"^ {0,3}(#{1,6})[ \t]+(.+?)(?:[ \t]+#+)?[ \t]*$", re.MULTILINE)
+_MD_INLINE_LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+
+
+def extract_headings(text: str) -> List[Tuple[int, str, str]]:
+    """(level, text, anchor) of ATX headings in markdown source outside fenced code blocks.
+
+    Text is stripped of inline markup and anchors are made unique like extract_toc(), so they
+    match the ids of the rendered page for headings without an explicit id.
+    """
+    headings: List[Tuple[int, str, str]] = []
+    used = set()
+    for is_code, segment in split_markdown_code(text):
+        if is_code:
+            continue
+        for m in _MD_HEADING_RE.finditer(segment):
+            plain = _TAG_RE.sub("", _MD_INLINE_LINK_RE.sub(r"\1", m.group(2)))
+            plain = " ".join(unescape(re.sub(r"[*_`]", "", plain)).split())
+            if not plain:
+                continue
+            base = _slugify(plain) or "section"
+            anchor, n = base, 2
+            while anchor in used:
+                anchor, n = f"{base}-{n}", n + 1
+            used.add(anchor)
+            headings.append((len(m.group(1)), plain, anchor))
+    return headings
+
+
+_JEKYLL_LINK_RE = re.compile(r"\{%\s*link\s+([^\s}]+)\s*%\}")
+# Prose constructs the structured pre-pass rewrites, in one scan: markdown links (URL may be a
+# Jekyll {% link %}), bare Jekyll link targets, code spans, plain *.md mentions
+_MD_PROSE_RE = re.compile(
+    r"(?P<link>\[([^\]]+)\]\(([^)]+)\))"
+    r"|(?P<jekyll>\]\((\{%\s*link\s+[^\s}]+\s*%\})\))"
+    r"|(?P<code>(?P<tick>`+)(.+?)(?<!`)(?P=tick)(?!`))"
+    r"|(?P<plain>(?<![^\s\-:])[A-Za-z0-9_\-/]+\.md(?=[\s.,:;\)\]]|$))",
+)
+_LINK_TAG_RE = re.compile(r'<a([^>]*?)\s+href=["\']([^"\']+)["\']([^>]*)>')
+_IMG_TAG_RE = re.compile(r'<img([^>]*?)\s+src=["\']([^"\']+)["\']([^>]*)>')
+# Image references in markdown source: ![alt](url "title") and inline <img src="url">
+_MD_IMAGE_REF_RE = re.compile(r'!\[[^\]]*\]\(\s*<?([^)\s>]+)|<img\b[^>]*?\ssrc=["\']([^"\']+)["\']', re.IGNORECASE)
+_IMG_SIZE_ATTR_RE = re.compile(r"\s(?:width|height)\s*=", re.IGNORECASE)
+
+
+def extract_image_refs(text: str) -> List[str]:
+    """Image URLs referenced by markdown text outside fenced code blocks, in order of appearance."""
+    refs: List[str] = []
+    for is_code, segment in split_markdown_code(text):
+        if not is_code:
+            refs.extend(m.group(1) or m.group(2) for m in _MD_IMAGE_REF_RE.finditer(segment))
+    return refs
+
+
 class LinkResolver:
-    """Resolves doc and asset links, processes markdown/HTML for internal URLs."""
+    """Resolves doc and asset links, processes markdown/HTML for internal URLs.
+
+    get_doc_entry(source_id, path) must also resolve `docs/<path>` to a doc indexed as `<path>`.
+    get_asset_version(source_id, path), if given, returns a content hash appended to asset URLs as
+    `?v=`, or None for a missing file. get_image_info(source_id, path), if given, returns
+    {"width", "height", "sources": [{"type", "srcset"}]} for images with generated variants, or None.
+    """
 
     def __init__(
         self,
         get_doc_entry: Callable[[str, str], Optional[dict]],
         url_for: Callable,
+        get_asset_version: Optional[Callable[[str, str], Optional[str]]] = None,
+        get_image_info: Optional[Callable[[str, str], Optional[dict]]] = None,
     ):
         self.get_doc_entry = get_doc_entry
         self.url_for = url_for
+        self.get_asset_version = get_asset_version
+        self.get_image_info = get_image_info
 
     def _resolve_source_relative_target(self, source_id: str, current_file_dir: str, relative_path: str) -> Optional[str]:
         """Resolve a relative path inside a docs source.
@@ -186,14 +314,12 @@ class LinkResolver:
         if not target:
             return None
         entry = self.get_doc_entry(source_id, target)
-        if not entry and target.startswith("docs/"):
-            entry = self.get_doc_entry(source_id, target[5:])
         if entry:
             return self.url_for("Docs.docs_home", category=source_id, file=entry["path"])
         return None
 
-    def resolve_asset_url(self, source_id: str, current_file_dir: str, image_url: str) -> Optional[str]:
-        """Resolve relative image/asset URL to docs asset route URL. Returns None for external/data URLs."""
+    def resolve_asset_target(self, source_id: str, current_file_dir: str, image_url: str) -> Optional[str]:
+        """Source-relative path of a relative image/asset URL. Returns None for external/data URLs."""
         parsed = urlparse(image_url)
         if parsed.scheme or image_url.strip().startswith("#"):
             return None
@@ -203,6 +329,19 @@ class LinkResolver:
         ext = os.path.splitext(target.split("?")[0])[1].lower()
         if ext not in DOC_ASSET_EXTENSIONS:
             return None
+        return target
+
+    def resolve_asset_url(self, source_id: str, current_file_dir: str, image_url: str) -> Optional[str]:
+        """Resolve relative image/asset URL to docs asset route URL. Returns None for external/data URLs."""
+        target = self.resolve_asset_target(source_id, current_file_dir, image_url)
+        if not target:
+            return None
+        return self._asset_url(source_id, target)
+
+    def _asset_url(self, source_id: str, target: str) -> str:
+        version = self.get_asset_version(source_id, target) if self.get_asset_version and "?" not in target else None
+        if version:
+            return self.url_for("Docs.docs_asset_by_source", source_id=source_id, asset_path=target, v=version)
         return self.url_for("Docs.docs_asset_by_source", source_id=source_id, asset_path=target)
 
     def process_markdown_file_links(self, text: str, source_id: str, current_file_dir: str) -> str:
@@ -241,31 +380,222 @@ class LinkResolver:
         )
         return text
 
+    def preprocess_markdown(self, text: str, source_id: str, current_file_dir: str) -> str:
+        """Structured alternative to process_jekyll_links + process_markdown_file_links.
+
+        Rewrites the same constructs in a single scan, but never inside fenced code blocks or
+        code spans (except a span that is exactly a *.md path, which becomes a link as before).
+        """
+        def jekyll_target(value: str) -> str:
+            m = _JEKYLL_LINK_RE.fullmatch(value.strip())
+            if not m:
+                return value
+            path = m.group(1)
+            return path[5:] if path.startswith("docs/") else path
+
+        def replace(m) -> str:
+            kind = m.lastgroup
+            if kind == "link":
+                link_text, link_url = m.group(2), jekyll_target(m.group(3))
+                new_url = self.resolve_doc_url(source_id, current_file_dir, link_url) if link_url.lower().endswith(".md") else None
+                return f"[{link_text}]({new_url or link_url})"
+            if kind == "jekyll":
+                return f"]({jekyll_target(m.group(5))})"
+            if kind == "code":
+                mention = m.group(8)
+                if len(m.group(7)) == 1 and mention.endswith(".md"):
+                    new_url = self.resolve_doc_url(source_id, current_file_dir, mention)
+                    if new_url:
+                        return f"[`{mention}`]({new_url})"
+                return m.group(0)
+            mention = m.group(0)
+            new_url = self.resolve_doc_url(source_id, current_file_dir, mention)
+            return f"[{mention}]({new_url})" if new_url else mention
+
+        return "".join(
+            part if is_code else _MD_PROSE_RE.sub(replace, part) for is_code, part in split_markdown_code(text)
+        )
+
+    def _rewrite_link_tag(self, before_href: str, link_url: str, after_href: str, source_id: str, current_file_dir: str) -> Optional[str]:
+        new_url = self.resolve_doc_url(source_id, current_file_dir, link_url)
+        if new_url:
+            return f'<a{before_href}href="{new_url}"{after_href}>'
+        return None
+
+    def _rewrite_img_tag(self, before: str, src: str, after: str, source_id: str, current_file_dir: str) -> Optional[str]:
+        """Local image: asset URL, lazy loading, and (with generated variants) intrinsic size and
+        a <picture> with WebP/AVIF sources."""
+        target = self.resolve_asset_target(source_id, current_file_dir, src)
+        if not target:
+            return None
+        new_url = self._asset_url(source_id, target)
+        closing = ">"
+        stripped = after.rstrip()
+        if stripped.endswith("/"):
+            after, closing = stripped[:-1].rstrip(), " />"
+        attrs = f"{before} {after}".lower()
+        extra = ""
+        if " loading=" not in attrs:
+            extra += ' loading="lazy"'
+        if " decoding=" not in attrs:
+            extra += ' decoding="async"'
+        info = self.get_image_info(source_id, target) if self.get_image_info else None
+        if info and not _IMG_SIZE_ATTR_RE.search(attrs):
+            extra += f' width="{info["width"]}" height="{info["height"]}"'
+        # Ensure space before src to avoid <imgsrc="..."> when before is empty
+        img = f'<img{before} src="{new_url}"{after}{extra}{closing}'
+        if not info or not info.get("sources"):
+            return img
+        sizes = f'(max-width: {info["width"]}px) 100vw, {info["width"]}px'
+        sources = "".join(
+            f'<source type="{source["type"]}" srcset="{source["srcset"]}" sizes="{sizes}">'
+            for source in info["sources"]
+        )
+        return f"<picture>{sources}{img}</picture>"
+
     def process_markdown_links(self, html_content: str, source_id: str, current_file_dir: str) -> str:
         """Process HTML links in rendered markdown; resolve .md to docs URLs."""
         def replace_link_in_tag(match):
-            before_href, link_url, after_href = match.group(1), match.group(2), match.group(3)
-            new_url = self.resolve_doc_url(source_id, current_file_dir, link_url)
-            if new_url:
-                return f'<a{before_href}href="{new_url}"{after_href}>'
-            return match.group(0)
-        return re.sub(
-            r'<a([^>]*?)\s+href=["\']([^"\']+)["\']([^>]*)>',
-            replace_link_in_tag,
-            html_content,
-        )
+            tag = self._rewrite_link_tag(match.group(1), match.group(2), match.group(3), source_id, current_file_dir)
+            return tag if tag is not None else match.group(0)
+        return _LINK_TAG_RE.sub(replace_link_in_tag, html_content)
 
     def process_markdown_images(self, html_content: str, source_id: str, current_file_dir: str) -> str:
         """Process <img src="..."> in HTML; resolve relative image URLs to docs asset route."""
         def replace_img_src(match):
-            before, src, after = match.group(1), match.group(2), match.group(3)
-            new_url = self.resolve_asset_url(source_id, current_file_dir, src)
-            if new_url:
-                # Ensure space before src to avoid <imgsrc="..."> when before is empty
-                return f'<img{before} src="{new_url}"{after}>'
-            return match.group(0)
-        return re.sub(
-            r'<img([^>]*?)\s+src=["\']([^"\']+)["\']([^>]*)>',
-            replace_img_src,
-            html_content,
-        )
+            tag = self._rewrite_img_tag(match.group(1), match.group(2), match.group(3), source_id, current_file_dir)
+            return tag if tag is not None else match.group(0)
+        return _IMG_TAG_RE.sub(replace_img_src, html_content)
+
+
+# One alternation of the chain's per-step patterns (alerts included), so the fused pass finds every
+# construct in a single scan. The shared leading "<" lets the regex engine skip ahead quickly.
+_FUSED_RE = re.compile(
+    r'<(?:'
+    r'(?P<mermaid>pre(?:><code class="(?:language-mermaid|mermaid)">|\s+lang="mermaid"><code>)(.*?)</code></pre>)'
+    r'|(?P<prism>pre\s+lang="([^"]+)"><code>)'
+    r'|(?P<quote>blockquote>\s*(.*?)\s*</blockquote>)'
+    r'|(?P<code>code(\s[^>]*)?>([^<]+)</code>)'
+    r'|(?P<link>a([^>]*?)\s+href=["\']([^"\']+)["\']([^>]*)>)'
+    r'|(?P<img>img([^>]*?)\s+src=["\']([^"\']+)["\']([^>]*)>)'
+    r')',
+    re.DOTALL,
+)
+_PRE_BLOCK_END = "</code></pre>"
+
+
+class _FusedFallback(Exception):
+    """Input the fused pass cannot reproduce exactly; use the step-by-step chain."""
+
+
+def postprocess_html(
+    html: str,
+    resolver: LinkResolver,
+    source_id: str,
+    current_file_dir: str,
+    translate: Optional[Callable[[str], str]] = None,
+) -> str:
+    """Single-pass equivalent of the post-conversion chain:
+    process_mermaid_blocks, process_code_blocks_for_prism, process_github_alerts,
+    process_color_swatches, LinkResolver.process_markdown_links, LinkResolver.process_markdown_images.
+
+    Finds every construct with one combined regex scan and applies the matching step, grouped in
+    chain order, so the output is identical to running the chain. Input the scan cannot pair up
+    the way the chain does uses the chain itself: <pre> blocks nested in code blocks, code blocks
+    that cross a blockquote's end, and mermaid sources that unescape to block markup.
+    """
+    tr = translate if callable(translate) else (lambda s: s)
+    try:
+        return _fused_pass(html, resolver, source_id, current_file_dir, tr, pre=True, alerts=True, inline=True)
+    except _FusedFallback:
+        html = process_mermaid_blocks(html)
+        html = process_code_blocks_for_prism(html)
+        html = process_github_alerts(html, translate=tr)
+        html = process_color_swatches(html)
+        html = resolver.process_markdown_links(html, source_id, current_file_dir)
+        return resolver.process_markdown_images(html, source_id, current_file_dir)
+
+
+def _fused_pass(
+    html: str,
+    resolver: LinkResolver,
+    source_id: str,
+    current_file_dir: str,
+    tr: Callable[[str], str],
+    *,
+    pre: bool,
+    alerts: bool,
+    inline: bool,
+) -> str:
+    """Apply the enabled step groups of the chain: pre (mermaid, prism), alerts, inline
+    (swatches, links, images). Group numbers below follow _FUSED_RE."""
+    # Prism conversion does not apply inside an already matched <pre lang> ... </code></pre> region
+    prism_region_end = -1
+
+    def again(text: str, **steps: bool) -> str:
+        return _fused_pass(text, resolver, source_id, current_file_dir, tr, **steps)
+
+    def replace(m) -> str:
+        nonlocal prism_region_end
+        kind = m.lastgroup
+        if kind == "code":
+            if inline:
+                swatch = _render_swatch(m.group(8) or "", m.group(9))
+                if swatch is not None:
+                    return swatch
+        elif kind == "link":
+            if inline:
+                tag = resolver._rewrite_link_tag(m.group(11), m.group(12), m.group(13), source_id, current_file_dir)
+                if tag is not None:
+                    return tag
+        elif kind == "img":
+            if inline:
+                tag = resolver._rewrite_img_tag(m.group(15), m.group(16), m.group(17), source_id, current_file_dir)
+                if tag is not None:
+                    return tag
+        elif kind == "mermaid":
+            if pre:
+                if "<pre" in m.group(2):
+                    # Nested blocks: the chain's per-pattern passes may pair them differently
+                    raise _FusedFallback()
+                content = unescape(m.group(2)).strip()
+                div = f'<div class="mermaid">{content}</div>'
+                if "<" in content:
+                    # Later steps see the unescaped source; markup that could change their match
+                    # boundaries outside the div is left to the chain
+                    if "blockquote" in content or "<pre" in content:
+                        raise _FusedFallback()
+                    if inline:
+                        div = again(div, pre=False, alerts=False, inline=True)
+                return div
+        elif kind == "prism":
+            if pre and m.start() >= prism_region_end:
+                block_end = m.string.find(_PRE_BLOCK_END, m.end())
+                if block_end != -1 and "<pre" in m.string[m.end():block_end]:
+                    # A nested block (e.g. mermaid) may own that end tag once the chain has converted it
+                    raise _FusedFallback()
+                if block_end != -1:
+                    prism_region_end = block_end + len(_PRE_BLOCK_END)
+                    return f'<pre><code class="language-{m.group(4)}">'
+        elif kind == "quote":
+            full = m.group(0)
+            if pre and "<pre" in full and _PRE_BLOCK_END not in full[full.rfind("<pre"):]:
+                # A code block that starts in the quote and ends after it: the chain converts the
+                # block before it looks for quotes
+                raise _FusedFallback()
+            if not alerts:
+                # Alerts are already handled for this region; only look inside the quote
+                return "<" + again(full[1:], pre=pre, alerts=False, inline=inline)
+            content = again(m.group(6), pre=pre, alerts=False, inline=False) if pre else m.group(6)
+            alert = _render_alert(content, tr)
+            if alert is None:
+                head, tail = full[:m.start(6) - m.start()], full[m.end(6) - m.start():]
+                if inline:
+                    content = again(content, pre=False, alerts=False, inline=True)
+                return head + content + tail
+            if inline:
+                alert = again(alert, pre=False, alerts=False, inline=True)
+            return alert
+        return m.group(0)
+
+    return _FUSED_RE.sub(replace, html)
@@ -0,0 +1,324 @@
+"""Render caches: bounded in-memory LRU with stats, a persistent on-disk HTML cache, and
+precompressed response bodies."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import sys
+from collections import OrderedDict
+from threading import Event, Lock, get_ident
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content-Encodings that compress_variants() can produce, in order of preference
+CONTENT_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+class _Flight:
+    """A value being computed by one thread, awaited by others."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class RenderCache:
+    """Thread-safe LRU cache limited by entry count and approximate byte size.
+
+    Entries may carry the source file mtime (or another version token) they were rendered
+    from; a lookup with a different mtime drops the entry and counts as a miss. get_or_create() coalesces
+    concurrent misses for the same key into a single computation.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self._lock = Lock()
+        self._items: "OrderedDict[Hashable, Tuple[Any, Optional[Hashable], int]]" = OrderedDict()
+        self._bytes = 0
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.coalesced = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def configure(self, max_entries: int, max_bytes: int) -> None:
+        """Change limits; evicts immediately if the cache is over the new budget."""
+        with self._lock:
+            self.max_entries = max(1, int(max_entries))
+            self.max_bytes = max(1, int(max_bytes))
+            self._shrink()
+
+    def get(self, key: Hashable, mtime: Optional[Hashable] = None) -> Optional[Any]:
+        """Return cached value or None. Stale entries (mtime differs) are dropped."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, item_mtime, _size = item
+            if mtime is not None and item_mtime is not None and item_mtime != mtime:
+                self._remove(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, mtime: Optional[Hashable] = None, size: Optional[int] = None) -> None:
+        """Store value; size defaults to its in-memory size. Values larger than the budget are not cached."""
+        if size is None:
+            size = sys.getsizeof(value)
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, mtime, size)
+            self._bytes += size
+            self._shrink()
+
+    def get_or_create(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        mtime: Optional[Hashable] = None,
+        size: Optional[int] = None,
+    ) -> Any:
+        """Return cached value, or compute it with factory() and store it.
+
+        Only one thread computes a given key at a time; concurrent callers wait for its
+        result (or its exception). None results are returned but not cached.
+        """
+        value = self.get(key, mtime=mtime)
+        if value is not None:
+            return value
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            value = factory()
+            if value is not None:
+                self.put(key, value, mtime=mtime, size=size)
+            flight.value = value
+            return value
+        except BaseException as ex:
+            flight.error = ex
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop all entries whose key matches predicate. Returns number dropped."""
+        with self._lock:
+            keys = [k for k in self._items if predicate(k)]
+            for k in keys:
+                self._remove(k)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def discard_docs(self, docs: Iterable[Tuple[str, str]]) -> int:
+        """Drop entries for (source_id, path) pairs, any locale. Keys start with (source_id, path)."""
+        docs = set(docs)
+        if not docs:
+            return 0
+        return self.discard_where(lambda k: (k[0], k[1]) in docs)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and usage for the admin page."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "coalesced": self.coalesced,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _value, _mtime, size = self._items.pop(key)
+        self._bytes -= size
+
+    def _shrink(self) -> None:
+        while self._items and (len(self._items) > self.max_entries or self._bytes > self.max_bytes):
+            _key, (_value, _mtime, size) = self._items.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+
+class DiskRenderCache:
+    """Rendered HTML stored as files under a cache directory, shared by processes and restarts.
+
+    Keys are digests of everything the output depends on (see make_key). Writes go to a temp
+    file and are renamed into place, so concurrent workers never see partial files. Hits touch
+    the file's mtime, so prune() evicts the least recently used files.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max(0, int(max_bytes))
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_bytes: int) -> None:
+        """Change size budget; 0 disables the cache."""
+        self.max_bytes = max(0, int(max_bytes))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Digest of all parts the rendered output depends on."""
+        return hashlib.sha1("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".html")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached HTML or None."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                html = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return html
+
+    def put(self, key: str, html: str) -> None:
+        """Store HTML atomically; I/O errors are ignored (the cache is best-effort)."""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        out = []
+        for root, _dirs, files in os.walk(self.directory):
+            for fn in files:
+                fp = os.path.join(root, fn)
+                try:
+                    st = os.stat(fp)
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, fp))
+        return out
+
+    def prune(self) -> int:
+        """Delete least recently used files until the total size fits max_bytes. Returns number deleted."""
+        if not os.path.isdir(self.directory):
+            return 0
+        files = sorted(self._files())
+        total = sum(size for _mtime, size, _fp in files)
+        deleted = 0
+        for _mtime, size, fp in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(fp)
+                total -= size
+                deleted += 1
+            except OSError:
+                pass
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and disk usage for the admin page."""
+        files = self._files() if os.path.isdir(self.directory) else []
+        return {
+            "enabled": self.enabled,
+            "dir": self.directory,
+            "files": len(files),
+            "bytes": sum(size for _mtime, size, _fp in files),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class PrecompressedBody:
+    """A response body kept with its compressed encodings, so it is compressed once, not per request."""
+
+    __slots__ = ("content_type", "data", "variants")
+
+    def __init__(self, content_type: str, data: bytes, variants: Dict[str, bytes]):
+        self.content_type = content_type
+        self.data = data
+        self.variants = variants
+
+    def __sizeof__(self) -> int:
+        return len(self.data) + sum(len(v) for v in self.variants.values())
+
+
+def compress_variants(data: bytes, min_size: int, gzip_level: int, brotli_quality: int) -> Dict[str, bytes]:
+    """Content-Encoding -> compressed data, in CONTENT_ENCODINGS order. Bodies under min_size are
+    not compressed, and encodings that do not make the body smaller are left out."""
+    if len(data) < min_size:
+        return {}
+    variants = {}
+    for encoding in CONTENT_ENCODINGS:
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=brotli_quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=gzip_level, mtime=0)
+        if len(compressed) < len(data):
+            variants[encoding] = compressed
+    return variants
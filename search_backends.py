@@ -0,0 +1,684 @@
+"""Full-text search backends: Whoosh and SQLite FTS5 behind one SearchBackend interface."""
+
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from markupsafe import escape
+
+from plugins.Docs.analyzers import CJK_LANG, analyzer_lang, doc_langs, make_field, schema_langs, translation_locales
+from plugins.Docs.constants import SEARCH_MAX_RESULTS, SQLITE_SEARCH_SCHEMA_VERSION
+
+if TYPE_CHECKING:
+    from plugins.Docs import Docs  # noqa: F401
+
+_TRANSLATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "translations")
+
+_WORD_RE = re.compile(r"\w+")
+
+# Highlight markers for SQLite snippet(); replaced by tags after the snippet text is escaped
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+
+def doc_key(source_id: str, path: str) -> str:
+    """Unique search index key of a document."""
+    return f"{source_id}:{path}"
+
+
+def substring_snippet(text: str, words: List[str], width: int = 40) -> str:
+    """Escaped excerpt around the first of words found in text, with that word highlighted."""
+    lower = text.lower()
+    found = [(lower.find(w), w) for w in words if w in lower]
+    if not found:
+        return ""
+    pos, word = min(found)
+    start = max(0, pos - width)
+    end = min(len(text), pos + len(word) + width)
+    return "".join((
+        "…" if start else "",
+        str(escape(text[start:pos])),
+        '<b class="match">', str(escape(text[pos:pos + len(word)])), "</b>",
+        str(escape(text[pos + len(word):end])),
+        "…" if end < len(text) else "",
+    ))
+
+
+def _dir_usage(path: str) -> Tuple[int, int]:
+    """(file count, bytes) of a file, or of the files under a directory."""
+    if os.path.isfile(path):
+        return 1, os.path.getsize(path)
+    files = 0
+    size = 0
+    for root, _dirs, names in os.walk(path):
+        for fn in names:
+            files += 1
+            try:
+                size += os.path.getsize(os.path.join(root, fn))
+            except OSError:
+                pass
+    return files, size
+
+
+class SearchBackend(ABC):
+    """Full-text index of the docs in plugin._docs_index.
+
+    Hits are dicts with source_id, path, base_name, lang and title, best first. Snippets are
+    computed separately, for the hits actually shown. generation changes with every committed
+    update, so results cached under it stay valid until then.
+    """
+
+    name = ""
+    label = ""
+
+    def __init__(self, plugin: "Docs"):
+        self.plugin = plugin
+        self.generation = 0
+
+    @abstractmethod
+    def available(self) -> bool:
+        """True if the backend's library is installed."""
+
+    @abstractmethod
+    def exists(self) -> bool:
+        """True if the index is built (or the backend is unavailable, so there is nothing to build)."""
+
+    @abstractmethod
+    def build(
+        self,
+        changed: Optional[Set[Tuple[str, str]]] = None,
+        removed: Optional[Set[Tuple[str, str]]] = None,
+    ) -> bool:
+        """Sync the index with _docs_index. Returns False if the update failed.
+
+        With changed/removed given, only those (source_id, path) docs are updated or deleted; otherwise
+        every doc is rewritten. Either way all changes are published at once, so searches keep using the
+        previous version until then. The index is recreated when missing or outdated.
+        """
+
+    @abstractmethod
+    def search(self, q: str) -> List[Dict[str, Any]]:
+        """Hits for query q, best first, at most SEARCH_MAX_RESULTS."""
+
+    @abstractmethod
+    def snippets(self, q: str, docs: List[Tuple[str, str]]) -> Dict[str, str]:
+        """Highlighted content snippets {doc key: HTML} of the given (source_id, path) docs for query q."""
+
+    def close(self) -> None:
+        """Release open searchers or connections; they are reopened on next use."""
+
+    def clear(self) -> None:
+        """Close and delete the index, so the next build() recreates it."""
+        self.close()
+
+    def info(self) -> Dict[str, Any]:
+        """Status for the admin page: installed, ready, dir, files, bytes, error."""
+        return {"name": self.name, "label": self.label, "installed": False, "ready": False, "dir": None,
+                "files": 0, "bytes": 0, "error": None}
+
+    @abstractmethod
+    def _index_path(self) -> str:
+        """File or directory the index is stored in."""
+
+    def _usage_info(self) -> Dict[str, Any]:
+        info = SearchBackend.info(self)
+        info.update(installed=self.available(), dir=self._index_path())
+        try:
+            info["ready"] = self.available() and self.exists()
+            if os.path.exists(self._index_path()):
+                info["files"], info["bytes"] = _dir_usage(self._index_path())
+        except Exception as ex:
+            info["error"] = str(ex)
+        return info
+
+    def _entries(self, changed: Optional[Set[Tuple[str, str]]], full: bool) -> List[Dict[str, Any]]:
+        if full:
+            return list(self.plugin._docs_index)
+        return [self.plugin._doc_entry_map[key] for key in sorted(changed or ()) if key in self.plugin._doc_entry_map]
+
+    def _read_entries(self, entries: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], str]]:
+        """Yield (entry, file content) for docs that can be read, reporting build progress."""
+        total = len(entries)
+        for done, entry in enumerate(entries, 1):
+            file_path = entry.get("file_path")
+            try:
+                if file_path and os.path.isfile(file_path):
+                    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+                        content = f.read()
+                    yield entry, content
+            except OSError as ex:
+                self.plugin.logger.debug("%s: skip %s: %s", self.label, file_path, ex)
+            if done % 10 == 0 or done == total:
+                self.plugin._set_index_progress(
+                    status="running", phase="search", processed=done, total=total,
+                    message=f"Building search index ({self.label})... {done}/{total}",
+                )
+
+    def _read_texts(self, docs: List[Tuple[str, str]]) -> Dict[str, str]:
+        texts: Dict[str, str] = {}
+        for source_id, path in docs:
+            entry = self.plugin._doc_entry_map.get((source_id, path))
+            try:
+                with open(entry["file_path"], "r", encoding="utf-8", errors="replace") as f:
+                    texts[doc_key(source_id, path)] = f.read()
+            except (OSError, KeyError, TypeError):
+                continue
+        return texts
+
+
+class WhooshBackend(SearchBackend):
+    """Whoosh index in cache/Docs/whoosh/ with per-language analyzers (see analyzers.py).
+
+    Only keys and titles are stored; snippets are highlighted from the doc files themselves.
+    Searchers are not thread-safe, so searches share one and take turns.
+    """
+
+    name = "whoosh"
+    label = "Whoosh"
+
+    def __init__(self, plugin: "Docs"):
+        super().__init__(plugin)
+        # Shared searcher: (generation, searcher, parser)
+        self._state: Optional[Tuple[int, Any, Any]] = None
+        self._lock = Lock()
+
+    def _index_path(self) -> str:
+        return self.plugin._whoosh_index_dir
+
+    def available(self) -> bool:
+        try:
+            import whoosh  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def exists(self) -> bool:
+        try:
+            from whoosh.index import exists_in
+        except ImportError:
+            return True
+        try:
+            return os.path.isdir(self._index_path()) and exists_in(self._index_path())
+        except Exception:
+            return False
+
+    @staticmethod
+    def schema(langs: Iterable[str]) -> Any:
+        """Schema with title_<lang> and content_<lang> fields per analyzer in langs; those are indexed, not stored."""
+        from whoosh.fields import Schema, STORED, ID
+
+        fields = {}
+        for lang in langs:
+            fields[f"title_{lang}"] = make_field(lang)
+            fields[f"content_{lang}"] = make_field(lang)
+        return Schema(
+            doc_key=ID(stored=True, unique=True),
+            path=STORED,
+            source_id=STORED,
+            base_name=STORED,
+            lang=STORED,
+            title=STORED,
+            **fields,
+        )
+
+    @staticmethod
+    def _schema_langs_of(schema: Any) -> Tuple[str, ...]:
+        return tuple(name[len("content_"):] for name in schema.names() if name.startswith("content_"))
+
+    @staticmethod
+    def _schema_signature(schema: Any) -> List[Tuple[str, str, bool]]:
+        """Field names, types and stored flags; an index with a different signature is recreated."""
+        return [(name, type(field).__name__, bool(field.stored)) for name, field in schema.items()]
+
+    def build(
+        self,
+        changed: Optional[Set[Tuple[str, str]]] = None,
+        removed: Optional[Set[Tuple[str, str]]] = None,
+    ) -> bool:
+        from app.core.lib.cache import clearCache
+        try:
+            from whoosh.index import create_in, exists_in, open_dir
+            from whoosh.writing import CLEAR
+        except ImportError:
+            self.plugin.logger.debug("Whoosh not installed, full-text search disabled")
+            return True
+        index_dir = self._index_path()
+        writer = None
+        try:
+            # One analyzer per locale the plugin has translations for
+            langs = schema_langs(translation_locales(_TRANSLATIONS_DIR))
+            schema = self.schema(langs)
+            os.makedirs(index_dir, exist_ok=True)
+            ix = None
+            if exists_in(index_dir):
+                try:
+                    ix = open_dir(index_dir)
+                    if self._schema_signature(ix.schema) != self._schema_signature(schema):
+                        ix.close()
+                        ix = None
+                except Exception:
+                    ix = None
+                if ix is None:
+                    self.close()
+                    clearCache("Docs/whoosh")
+                    os.makedirs(index_dir, exist_ok=True)
+            full = ix is None or changed is None
+            if ix is None:
+                ix = create_in(index_dir, schema)
+
+            entries = self._entries(changed, full)
+            writer = ix.writer()
+            if not full:
+                for source_id, path in removed or ():
+                    writer.delete_by_term("doc_key", doc_key(source_id, path))
+            # update_document also purges older copies by doc_key; a full rewrite replaces everything anyway
+            write = writer.add_document if full else writer.update_document
+            for entry, content in self._read_entries(entries):
+                try:
+                    lang = (entry.get("lang") or "default").lower()
+                    fields = {
+                        "doc_key": doc_key(entry["source_id"], entry["path"]),
+                        "path": entry["path"],
+                        "source_id": entry["source_id"],
+                        "base_name": entry["base_name"],
+                        "lang": lang,
+                        "title": entry.get("title", ""),
+                    }
+                    # Each doc is analyzed only by the analyzers of its own language
+                    for field_lang in doc_langs(lang, langs):
+                        fields[f"title_{field_lang}"] = entry.get("title", "")
+                        fields[f"content_{field_lang}"] = content
+                    write(**fields)
+                except Exception as ex:
+                    self.plugin.logger.debug("Whoosh: skip %s: %s", entry.get("file_path"), ex)
+            if full:
+                # Drop all previous segments in the same commit that publishes the new one
+                writer.commit(mergetype=CLEAR)
+            else:
+                writer.commit()
+            writer = None
+            # Shared searcher and cached results are replaced on next search
+            self.generation += 1
+            self.plugin.logger.debug(
+                "Whoosh index %s in %s (%s docs)", "rebuilt" if full else "updated", index_dir, len(entries),
+            )
+            return True
+        except Exception as ex:
+            if writer is not None:
+                try:
+                    writer.cancel()
+                except Exception:
+                    pass
+            self.plugin.logger.warning("Whoosh index build failed: %s", ex)
+            return False
+
+    def close(self) -> None:
+        with self._lock:
+            state, self._state = self._state, None
+            if state is not None:
+                try:
+                    state[1].close()
+                except Exception:
+                    pass
+
+    def clear(self) -> None:
+        from app.core.lib.cache import clearCache
+        self.close()
+        if os.path.isdir(self._index_path()):
+            clearCache("Docs/whoosh")
+
+    def _searcher(self) -> Optional[Tuple[Any, Any]]:
+        """Shared (searcher, query parser), reopened when the index was updated. Caller holds _lock."""
+        from whoosh.index import exists_in, open_dir
+        from whoosh.qparser import MultifieldParser, OrGroup
+
+        state = self._state
+        if state is not None and state[0] == self.generation:
+            return state[1], state[2]
+        if state is not None:
+            self._state = None
+            try:
+                state[1].close()
+            except Exception:
+                pass
+        if not exists_in(self._index_path()):
+            return None
+        generation = self.generation
+        ix = open_dir(self._index_path())
+        searcher = ix.searcher()
+        # Query only the languages some doc was indexed in; each field analyzes the query its own way
+        indexed = set(searcher.reader().indexed_field_names())
+        fields = [
+            f"{kind}_{lang}" for lang in self._schema_langs_of(ix.schema) for kind in ("title", "content")
+            if f"{kind}_{lang}" in indexed
+        ]
+        parser = MultifieldParser(fields or ["title_en", "content_en"], schema=ix.schema, group=OrGroup)
+        self._state = (generation, searcher, parser)
+        return searcher, parser
+
+    def search(self, q: str) -> List[Dict[str, Any]]:
+        if not q or not q.strip() or not self.available():
+            return []
+        try:
+            with self._lock:
+                shared = self._searcher()
+                if shared is None:
+                    return []
+                searcher, parser = shared
+                results = searcher.search(parser.parse(q), limit=SEARCH_MAX_RESULTS)
+                return [
+                    {
+                        "source_id": hit["source_id"],
+                        "path": hit["path"],
+                        "base_name": hit["base_name"],
+                        "lang": hit.get("lang", "default"),
+                        "title": hit.get("title", ""),
+                    }
+                    for hit in results
+                ]
+        except Exception as ex:
+            self.plugin.logger.debug("Whoosh search failed: %s", ex)
+            return []
+
+    def snippets(self, q: str, docs: List[Tuple[str, str]]) -> Dict[str, str]:
+        if not q or not docs or not self.available():
+            return {}
+        from whoosh.query import Or, Term
+
+        # Content is not stored in the index, so the text is read from the doc files (a page of hits)
+        texts = self._read_texts(docs)
+        if not texts:
+            return {}
+        out: Dict[str, str] = {}
+        try:
+            with self._lock:
+                shared = self._searcher()
+                if shared is None:
+                    return {}
+                searcher, parser = shared
+                langs = self._schema_langs_of(searcher.schema)
+                # The doc key filter limits the search to the requested hits without affecting highlighting
+                only = Or([Term("doc_key", key) for key in texts])
+                for hit in searcher.search(parser.parse(q), filter=only, limit=len(texts)):
+                    text = texts[hit["doc_key"]]
+                    snippet = None
+                    for lang in doc_langs(hit.get("lang", "default"), langs):
+                        try:
+                            snippet = hit.highlights(f"content_{lang}", text=text, top=2, minscore=1)
+                        except Exception:
+                            snippet = None
+                        if snippet:
+                            break
+                    if snippet:
+                        out[hit["doc_key"]] = snippet.strip()
+        except Exception as ex:
+            self.plugin.logger.debug("Whoosh highlighting failed: %s", ex)
+        return out
+
+    def info(self) -> Dict[str, Any]:
+        return self._usage_info()
+
+
+class SqliteFtsBackend(SearchBackend):
+    """SQLite FTS5 index in one database file (stdlib sqlite3) with BM25 ranking and snippet() highlights.
+
+    Docs are stored once, with their content, in an FTS5 table (unicode61 tokenizer, query words of
+    three or more letters also match as prefixes). CJK docs go to a trigram table when SQLite has the
+    trigram tokenizer. Updates run in one transaction; the database uses WAL, so searches from any
+    worker keep reading the last committed version while an update runs.
+    """
+
+    name = "sqlite"
+    label = "SQLite FTS5"
+
+    _fts5: Optional[bool] = None
+    _trigram: Optional[bool] = None
+
+    def __init__(self, plugin: "Docs"):
+        super().__init__(plugin)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = Lock()
+
+    def _index_path(self) -> str:
+        return self.plugin._sqlite_index_path
+
+    @classmethod
+    def _probe(cls) -> None:
+        if cls._fts5 is not None:
+            return
+        conn = sqlite3.connect(":memory:")
+        try:
+            try:
+                conn.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+                cls._fts5 = True
+            except sqlite3.Error:
+                cls._fts5 = False
+            try:
+                conn.execute("CREATE VIRTUAL TABLE t3 USING fts5(x, tokenize='trigram')")
+                cls._trigram = True
+            except sqlite3.Error:
+                cls._trigram = False
+        finally:
+            conn.close()
+
+    def available(self) -> bool:
+        self._probe()
+        return bool(self._fts5)
+
+    def _tables(self) -> Tuple[str, ...]:
+        return ("docs_fts", "docs_cjk") if self._trigram else ("docs_fts",)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._index_path(), timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """Shared read connection. Caller holds _lock."""
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def exists(self) -> bool:
+        if not self.available():
+            return True
+        if not os.path.isfile(self._index_path()):
+            return False
+        try:
+            with self._lock:
+                row = self._reader().execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            return row is not None and row[0] == str(SQLITE_SEARCH_SCHEMA_VERSION)
+        except sqlite3.Error:
+            return False
+
+    def _create(self, conn: sqlite3.Connection) -> None:
+        for table in ("meta", "docs") + self._tables():
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            "CREATE TABLE docs (id INTEGER PRIMARY KEY, doc_key TEXT UNIQUE NOT NULL, source_id TEXT, "
+            "path TEXT, base_name TEXT, lang TEXT, title TEXT, fts TEXT)"
+        )
+        conn.execute(
+            "CREATE VIRTUAL TABLE docs_fts USING fts5(title, content, tokenize='unicode61 remove_diacritics 2')"
+        )
+        if self._trigram:
+            conn.execute("CREATE VIRTUAL TABLE docs_cjk USING fts5(title, content, tokenize='trigram')")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('schema', ?)", (str(SQLITE_SEARCH_SCHEMA_VERSION),))
+
+    def _delete(self, conn: sqlite3.Connection, key: str) -> None:
+        row = conn.execute("SELECT id, fts FROM docs WHERE doc_key = ?", (key,)).fetchone()
+        if row is not None:
+            conn.execute(f"DELETE FROM {row[1]} WHERE rowid = ?", (row[0],))
+            conn.execute("DELETE FROM docs WHERE id = ?", (row[0],))
+
+    def build(
+        self,
+        changed: Optional[Set[Tuple[str, str]]] = None,
+        removed: Optional[Set[Tuple[str, str]]] = None,
+    ) -> bool:
+        if not self.available():
+            self.plugin.logger.debug("SQLite FTS5 not available, full-text search disabled")
+            return True
+        conn = None
+        try:
+            full = changed is None or not self.exists()
+            os.makedirs(os.path.dirname(self._index_path()), exist_ok=True)
+            conn = self._connect()
+            entries = self._entries(changed, full)
+            conn.execute("BEGIN IMMEDIATE")
+            if full:
+                self._create(conn)
+            else:
+                for source_id, path in set(removed or ()) | set(changed or ()):
+                    self._delete(conn, doc_key(source_id, path))
+            for entry, content in self._read_entries(entries):
+                lang = (entry.get("lang") or "default").lower()
+                table = "docs_cjk" if self._trigram and analyzer_lang(lang) == CJK_LANG else "docs_fts"
+                cur = conn.execute(
+                    "INSERT INTO docs (doc_key, source_id, path, base_name, lang, title, fts) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        doc_key(entry["source_id"], entry["path"]), entry["source_id"], entry["path"],
+                        entry["base_name"], lang, entry.get("title", ""), table,
+                    ),
+                )
+                conn.execute(
+                    f"INSERT INTO {table} (rowid, title, content) VALUES (?, ?, ?)",
+                    (cur.lastrowid, entry.get("title", ""), content),
+                )
+            conn.execute("COMMIT")
+            self.generation += 1
+            self.plugin.logger.debug(
+                "SQLite search index %s in %s (%s docs)", "rebuilt" if full else "updated",
+                self._index_path(), len(entries),
+            )
+            return True
+        except Exception as ex:
+            if conn is not None and conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            self.plugin.logger.warning("SQLite search index build failed: %s", ex)
+            return False
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _queries(self, q: str) -> List[Tuple[str, str, Tuple[Any, ...], bool]]:
+        """(table, WHERE clause, parameters, is full-text match) per FTS table for query q.
+
+        Words are OR-ed, like in Whoosh. Only full-text matches can be ranked and highlighted.
+        """
+        words = [w.lower() for w in _WORD_RE.findall(q)]
+        if not words:
+            return []
+        # Prefix matches stand in for stemming; short words would match too much
+        main = " OR ".join(f'"{w}"*' if len(w) >= 3 else f'"{w}"' for w in words)
+        queries = [("docs_fts", "docs_fts MATCH ?", (main,), True)]
+        if self._trigram:
+            # Trigram MATCH needs three characters; shorter words are matched as substrings
+            long_words = [w for w in words if len(w) >= 3]
+            if long_words:
+                queries.append(("docs_cjk", "docs_cjk MATCH ?", (" OR ".join(f'"{w}"' for w in long_words),), True))
+            else:
+                likes = " OR ".join("docs_cjk.title LIKE ? OR docs_cjk.content LIKE ?" for _w in words)
+                queries.append(("docs_cjk", likes, tuple(p for w in words for p in (f"%{w}%", f"%{w}%")), False))
+        return queries
+
+    def search(self, q: str) -> List[Dict[str, Any]]:
+        if not q or not q.strip() or not self.available():
+            return []
+        hits: List[Tuple[float, Dict[str, Any]]] = []
+        try:
+            with self._lock:
+                conn = self._reader()
+                for table, where, params, matched in self._queries(q):
+                    # BM25 with titles weighted above content; lower is better
+                    rank = f"bm25({table}, 10.0, 1.0)" if matched else "0.0"
+                    rows = conn.execute(
+                        f"SELECT d.source_id, d.path, d.base_name, d.lang, d.title, {rank} "
+                        f"FROM {table} JOIN docs d ON d.id = {table}.rowid WHERE {where} ORDER BY {rank} LIMIT ?",
+                        params + (SEARCH_MAX_RESULTS,),
+                    ).fetchall()
+                    hits.extend(
+                        (rank, {"source_id": sid, "path": path, "base_name": base, "lang": lang, "title": title})
+                        for sid, path, base, lang, title, rank in rows
+                    )
+        except sqlite3.Error as ex:
+            self.plugin.logger.debug("SQLite search failed: %s", ex)
+            return []
+        hits.sort(key=lambda h: h[0])
+        return [hit for _rank, hit in hits[:SEARCH_MAX_RESULTS]]
+
+    def snippets(self, q: str, docs: List[Tuple[str, str]]) -> Dict[str, str]:
+        if not q or not docs or not self.available():
+            return {}
+        keys = [doc_key(source_id, path) for source_id, path in docs]
+        marks = ", ".join("?" for _k in keys)
+        out: Dict[str, str] = {}
+        try:
+            with self._lock:
+                conn = self._reader()
+                for table, where, params, matched in self._queries(q):
+                    if not matched:
+                        rows = conn.execute(
+                            f"SELECT d.doc_key, {table}.content FROM {table} JOIN docs d ON d.id = {table}.rowid "
+                            f"WHERE ({where}) AND d.doc_key IN ({marks})",
+                            params + tuple(keys),
+                        ).fetchall()
+                        words = [w.lower() for w in _WORD_RE.findall(q)]
+                        out.update((key, substring_snippet(text, words)) for key, text in rows)
+                        continue
+                    rows = conn.execute(
+                        f"SELECT d.doc_key, snippet({table}, 1, ?, ?, '…', 24) "
+                        f"FROM {table} JOIN docs d ON d.id = {table}.rowid WHERE ({where}) AND d.doc_key IN ({marks})",
+                        (_MARK_START, _MARK_END) + params + tuple(keys),
+                    ).fetchall()
+                    for key, snippet in rows:
+                        if snippet and _MARK_START in snippet:
+                            out[key] = (
+                                str(escape(snippet.strip()))
+                                .replace(_MARK_START, '<b class="match">')
+                                .replace(_MARK_END, "</b>")
+                            )
+        except sqlite3.Error as ex:
+            self.plugin.logger.debug("SQLite highlighting failed: %s", ex)
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+    def clear(self) -> None:
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self._index_path() + suffix)
+            except OSError:
+                pass
+
+    def info(self) -> Dict[str, Any]:
+        info = self._usage_info()
+        if os.path.isfile(self._index_path()):
+            # The WAL and shared-memory files belong to the database too
+            extra = [self._index_path() + s for s in ("-wal", "-shm") if os.path.isfile(self._index_path() + s)]
+            info["files"] += len(extra)
+            info["bytes"] += sum(os.path.getsize(p) for p in extra)
+        return info
+
+
+SEARCH_BACKEND_CLASSES = {"whoosh": WhooshBackend, "sqlite": SqliteFtsBackend}
+
+
+def make_search_backend(name: str, plugin: "Docs") -> SearchBackend:
+    """Backend instance for a SEARCH_BACKENDS name."""
+    return SEARCH_BACKEND_CLASSES[name](plugin)
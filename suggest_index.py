@@ -0,0 +1,119 @@
+"""Prefix index of doc titles, headings and their words, for search-as-you-type suggestions."""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from heapq import nsmallest
+from typing import Any, Container, Dict, Iterable, List, Optional, Tuple
+
+from plugins.Docs.constants import SUGGEST_MAX_WORDS, SUGGEST_MIN_TERM_LENGTH, SUGGEST_SCAN_LIMIT
+
+# Suggestion kinds, in ranking order
+KINDS = ("title", "heading", "term")
+
+_WORD_RE = re.compile(r"\w+")
+
+DocKey = Tuple[str, str]
+# (kind, doc key, anchor, docs): doc key and anchor for titles and headings, docs for terms
+Target = Tuple[int, Optional[DocKey], str, Tuple[DocKey, ...]]
+
+
+def normalize_prefix(text: str) -> str:
+    """Lowercase text with whitespace collapsed, as matched against the index."""
+    return " ".join(text.lower().split())
+
+
+class SuggestIndex:
+    """Sorted array of distinct normalized strings, searched by prefix with bisect.
+
+    Each title and heading is indexed from each of its first SUGGEST_MAX_WORDS word starts, so a
+    prefix also matches inside it ("pump" finds "Heat pump"), and their words are indexed as query
+    terms. Rows are (string, item number, word position). An item is a distinct text with its
+    targets (kind, doc key, anchor, docs): the docs it is a title or heading of, and for a term
+    the docs it occurs in.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._rows: List[Tuple[int, int]] = []
+        self._items: List[Tuple[str, List[Target]]] = []
+
+    @classmethod
+    def build(cls, entries: Iterable[Dict[str, Any]]) -> "SuggestIndex":
+        """Index titles and headings ([text, anchor]) of doc index entries."""
+        items: Dict[str, Tuple[str, List[Target]]] = {}
+        terms: Dict[str, Dict[DocKey, None]] = {}
+        for e in entries:
+            key = (e["source_id"], e["path"])
+            texts = [(e.get("title") or "", "")] + [tuple(h) for h in e.get("headings") or ()]
+            for i, (text, anchor) in enumerate(texts):
+                normalized = normalize_prefix(text)
+                if not normalized:
+                    continue
+                items.setdefault(normalized, (text, []))[1].append((0 if i == 0 else 1, key, anchor, ()))
+                for word in _WORD_RE.findall(normalized):
+                    if len(word) >= SUGGEST_MIN_TERM_LENGTH and not word.isdigit():
+                        terms.setdefault(word, {})[key] = None
+        for word, docs in terms.items():
+            items.setdefault(word, (word, []))[1].append((2, None, "", tuple(docs)))
+
+        index = cls()
+        rows: List[Tuple[str, int, int]] = []
+        for normalized, (text, targets) in items.items():
+            number = len(index._items)
+            targets.sort(key=lambda target: target[0])
+            index._items.append((text, targets))
+            for pos, m in enumerate(_WORD_RE.finditer(normalized)):
+                if pos >= SUGGEST_MAX_WORDS:
+                    break
+                rows.append((normalized[m.start():], number, pos))
+        rows.sort()
+        index._keys = [row[0] for row in rows]
+        index._rows = [(number, pos) for _key, number, pos in rows]
+        return index
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def complete(
+        self, prefix: str, limit: int, visible: Optional[Container[DocKey]] = None
+    ) -> List[Tuple[str, str, Optional[DocKey], str]]:
+        """Best (text, kind, doc key, anchor) completions of prefix, from docs in visible (all if None).
+
+        Matches at the start of the text rank first, then titles, headings and terms; terms found in
+        more docs and shorter texts rank higher. A text found in several docs is suggested once, for
+        its first visible target. At most SUGGEST_SCAN_LIMIT rows are looked at.
+        """
+        prefix = normalize_prefix(prefix)
+        if not prefix or limit <= 0:
+            return []
+        best: Dict[int, Tuple[Tuple[bool, int, int, int], Target]] = {}
+        start = bisect_left(self._keys, prefix)
+        end = min(start + SUGGEST_SCAN_LIMIT, len(self._keys))
+        for key, (number, pos) in zip(self._keys[start:end], self._rows[start:end]):
+            if not key.startswith(prefix):
+                break
+            found = best.get(number)
+            if found is not None and (pos or not found[0][0]):
+                continue
+            text, targets = self._items[number]
+            for target in targets:
+                if visible is None or _is_visible(target, visible):
+                    best[number] = ((pos > 0, target[0], -len(target[3]), len(text)), target)
+                    break
+        found = nsmallest(limit, best.items(), key=lambda item: item[1][0])
+        return [(self._items[n][0], KINDS[t[0]], t[1], t[2]) for n, (_rank, t) in found]
+
+    def stats(self) -> Dict[str, int]:
+        """Counts for the admin page."""
+        return {
+            "items": len(self._items),
+            "rows": len(self._keys),
+        }
+
+
+def _is_visible(target: Target, visible: Container[DocKey]) -> bool:
+    if target[1] is not None:
+        return target[1] in visible
+    return any(doc in visible for doc in target[3])
@@ -0,0 +1,86 @@
+"""Shared fixtures for the Docs plugin tests.
+
+Run from the osysHome project root: python -m pytest plugins/Docs/tests
+"""
+
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the app file cache (manifest, snapshot, render and search caches) at a temporary directory."""
+    import app.core.lib.cache as cache
+    import plugins.Docs as docs_plugin
+
+    root = str(tmp_path / "cache")
+
+    def full_filename(name, directory=""):
+        return os.path.join(root, directory, name)
+
+    def save_to_cache(name, data, directory=""):
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+        with open(full_filename(name, directory), "wb") as f:
+            f.write(data)
+
+    def exist_in_cache(name, directory=""):
+        return os.path.isfile(full_filename(name, directory))
+
+    for module in (cache, docs_plugin):
+        monkeypatch.setattr(module, "getCacheDir", lambda: root)
+        monkeypatch.setattr(module, "getFullFilename", full_filename)
+        monkeypatch.setattr(module, "saveToCache", save_to_cache)
+        monkeypatch.setattr(module, "existInCache", exist_in_cache)
+    return root
+
+
+@pytest.fixture
+def project(tmp_path):
+    """Project root with core docs (docs/) and an empty plugins directory."""
+    root = tmp_path / "project"
+    (root / "docs" / "sub").mkdir(parents=True)
+    (root / "plugins").mkdir()
+    (root / "docs" / "index.md").write_text("# Index\n\nSee [the guide](sub/guide.md).\n", encoding="utf-8")
+    (root / "docs" / "sub" / "guide.md").write_text(
+        "# Guide\n\nThe pump heats water.\n\n## Setup\n\nConnect the sensor.\n", encoding="utf-8"
+    )
+    return root
+
+
+@pytest.fixture
+def make_plugin(cache_dir, project):
+    """Factory for Docs plugin instances indexing the project docs; instances share the file cache,
+    like several workers of one installation."""
+    from plugins.Docs import Docs
+
+    def make(**config):
+        app = Flask(__name__)
+        plugin = Docs(app)
+        plugin.project_root = str(project)
+        plugin.plugins_dir = str(project / "plugins")
+        plugin.config.update(config)
+        plugin.route_docs()
+        app.register_blueprint(plugin.blueprint)
+        return plugin
+
+    return make
+
+
+@pytest.fixture
+def edit_file():
+    """Rewrite a file and move its mtime forward, so the change is seen on filesystems with coarse mtimes."""
+
+    def edit(path, text):
+        st = os.stat(path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+
+    return edit
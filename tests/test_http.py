@@ -0,0 +1,86 @@
+"""HTTP validators: ETag / Last-Modified, 304 responses and Vary."""
+
+import pytest
+
+from plugins.Docs import indexer
+
+GUIDE = ("core", "sub/guide.md")
+
+
+@pytest.fixture
+def plugin(make_plugin):
+    plugin = make_plugin()
+    indexer.build_docs_index(plugin)
+    return plugin
+
+
+def respond(plugin, etag_parts, headers=None, shared=False, last_modified=1_700_000_000):
+    rendered = []
+
+    def render():
+        rendered.append(True)
+        return "<p>body</p>"
+
+    with plugin._app.test_request_context("/", headers=headers or {}):
+        response = plugin._conditional_response(etag_parts, last_modified, render, shared=shared)
+    return response, bool(rendered)
+
+
+def test_conditional_response_sets_validators(plugin):
+    response, rendered = respond(plugin, ("view", "a"))
+    assert rendered and response.status_code == 200
+    assert response.get_etag()[0]
+    assert response.last_modified is not None
+    assert "Cookie" in response.vary
+    assert response.cache_control.private and response.cache_control.no_cache
+
+
+def test_conditional_response_not_modified(plugin):
+    etag = respond(plugin, ("view", "a"))[0].get_etag()[0]
+
+    response, rendered = respond(plugin, ("view", "a"), {"If-None-Match": f'"{etag}"'})
+    assert response.status_code == 304 and not rendered
+    assert "Cookie" in response.vary
+
+    response, rendered = respond(plugin, ("view", "b"), {"If-None-Match": f'"{etag}"'})
+    assert response.status_code == 200 and rendered
+
+
+def test_conditional_response_if_modified_since(plugin):
+    response, rendered = respond(plugin, ("view", "a"), {"If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"})
+    assert response.status_code == 304 and not rendered
+    response, rendered = respond(plugin, ("view", "a"), {"If-Modified-Since": "Sat, 01 Jan 2000 00:00:00 GMT"})
+    assert response.status_code == 200 and rendered
+
+
+def test_shared_response_varies_by_encoding(plugin):
+    response, _ = respond(plugin, ("search", "q"), {"Accept-Encoding": "gzip"}, shared=True)
+    assert response.status_code == 200
+    assert {"Accept-Encoding", "Cookie"} <= set(response.vary)
+
+
+def test_etag_depends_on_user(plugin, monkeypatch):
+    etag = respond(plugin, ("view", "a"))[0].get_etag()[0]
+    monkeypatch.setattr(type(plugin), "_current_user_id", staticmethod(lambda: "42"))
+    assert respond(plugin, ("view", "a"))[0].get_etag()[0] != etag
+
+
+def test_doc_validator_follows_edit_indexed_by_another_worker(make_plugin, project, edit_file):
+    worker_a, worker_b = make_plugin(), make_plugin()
+    indexer.build_docs_index(worker_a)
+    indexer.build_docs_index(worker_b)
+    token = worker_b._doc_validator(*GUIDE)[0]
+
+    edit_file(project / "docs" / "sub" / "guide.md", "# Guide\n\nThe pump cools water.\n")
+    indexer.build_docs_index(worker_a)
+    indexer.build_docs_index(worker_b)
+    assert worker_b._doc_validator(*GUIDE)[0] != token
+    assert worker_b._doc_validator(*GUIDE) == worker_a._doc_validator(*GUIDE)
+
+
+def test_doc_validator_ignores_hash_of_entry_with_other_size(plugin, project, edit_file):
+    token = plugin._doc_validator(*GUIDE)[0]
+    guide = project / "docs" / "sub" / "guide.md"
+    edit_file(guide, "# Guide\n\nThe pump cools water quickly.\n")
+    plugin._doc_entry_map[GUIDE]["mtime"] = guide.stat().st_mtime
+    assert plugin._doc_validator(*GUIDE)[0] != token
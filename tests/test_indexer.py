@@ -0,0 +1,69 @@
+"""Manifest-based incremental index builds."""
+
+from plugins.Docs import indexer
+
+GUIDE = ("core", "sub/guide.md")
+
+
+def test_rebuild_reuses_unchanged_entries(make_plugin, project, edit_file):
+    plugin = make_plugin()
+    indexer.build_docs_index(plugin)
+    index_entry = plugin._doc_entry_map[("core", "index.md")]
+    guide_entry = plugin._doc_entry_map[GUIDE]
+
+    edit_file(project / "docs" / "sub" / "guide.md", "# Guide v2\n\nThe pump cools water.\n")
+    indexer.build_docs_index(plugin)
+
+    assert plugin._doc_entry_map[("core", "index.md")] is index_entry
+    assert plugin._doc_entry_map[GUIDE] is not guide_entry
+    assert plugin._doc_entry_map[GUIDE]["title"] == "Guide v2"
+
+
+def test_rebuild_detects_added_and_removed_docs(make_plugin, project):
+    plugin = make_plugin()
+    indexer.build_docs_index(plugin)
+    (project / "docs" / "new.md").write_text("# New\n", encoding="utf-8")
+    (project / "docs" / "sub" / "guide.md").unlink()
+    indexer.build_docs_index(plugin)
+
+    assert ("core", "new.md") in plugin._doc_entry_map
+    assert GUIDE not in plugin._doc_entry_map
+    assert set(indexer.load_manifest()) == {e["file_path"] for e in plugin._docs_index}
+
+
+def test_rebuild_with_manifest_saved_by_another_worker(make_plugin, project, edit_file):
+    """Worker A indexes an edit and saves the shared manifest; worker B must not keep its old entry."""
+    worker_a, worker_b = make_plugin(), make_plugin()
+    indexer.build_docs_index(worker_a)
+    indexer.build_docs_index(worker_b)
+    guide = project / "docs" / "sub" / "guide.md"
+
+    edit_file(guide, "# Guide renamed\n\nThe zebra pump.\n")
+    indexer.build_docs_index(worker_a)
+    indexer.build_docs_index(worker_b)
+
+    entry = worker_b._doc_entry_map[GUIDE]
+    assert entry["title"] == "Guide renamed"
+    assert entry["content_hash"] == indexer.file_content_hash(str(guide))
+    assert [key for key, _score in worker_b._fallback_index.search("zebra", 10)] == [GUIDE]
+
+
+def test_category_tree_built_during_index_swap_is_not_cached(make_plugin, project, edit_file, monkeypatch):
+    plugin = make_plugin()
+    indexer.build_docs_index(plugin)
+    edit_file(project / "docs" / "sub" / "guide.md", "# Guide v2\n")
+    filter_index_by_locale = indexer.filter_index_by_locale
+
+    def filter_then_rebuild(entries, locale):
+        # A rebuild is published while the request builds the tree from the previous index
+        docs = filter_index_by_locale(entries, locale)
+        monkeypatch.setattr(indexer, "filter_index_by_locale", filter_index_by_locale)
+        indexer.build_docs_index(plugin)
+        return docs
+
+    monkeypatch.setattr(indexer, "filter_index_by_locale", filter_then_rebuild)
+    with plugin._app.test_request_context("/"):
+        stale = indexer.get_category_tree(plugin, "en")
+        tree = indexer.get_category_tree(plugin, "en")
+    assert "Guide" in [doc["title"] for cat in stale for doc in cat["documents"]]
+    assert "Guide v2" in [doc["title"] for cat in tree for doc in cat["documents"]]
@@ -0,0 +1,107 @@
+"""postprocess_html must produce the same HTML as the step-by-step post-conversion chain."""
+
+import glob
+import os
+import random
+
+import pytest
+
+from plugins.Docs.markdown_converter import get_markdown_converter
+from plugins.Docs.markdown_processor import (
+    LinkResolver,
+    postprocess_html,
+    process_code_blocks_for_prism,
+    process_color_swatches,
+    process_github_alerts,
+    process_mermaid_blocks,
+)
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOCS = {("Docs", "README.md"), ("Docs", "DOCUMENTATION.md"), ("Docs", "sub/page.md")}
+
+
+def url_for(endpoint, **values):
+    return f"/{endpoint}?" + "&".join(f"{k}={v}" for k, v in sorted(values.items()))
+
+
+def translate(key):
+    return f"t:{key}"
+
+
+RESOLVER = LinkResolver(
+    lambda source_id, path: {"path": path} if (source_id, path) in DOCS else None,
+    url_for,
+    get_asset_version=lambda source_id, path: "v1",
+)
+
+
+def chain(html, source_id="Docs", current_dir=""):
+    html = process_mermaid_blocks(html)
+    html = process_code_blocks_for_prism(html)
+    html = process_github_alerts(html, translate=translate)
+    html = process_color_swatches(html)
+    html = RESOLVER.process_markdown_links(html, source_id, current_dir)
+    return RESOLVER.process_markdown_images(html, source_id, current_dir)
+
+
+def fused(html, source_id="Docs", current_dir=""):
+    return postprocess_html(html, RESOLVER, source_id, current_dir, translate)
+
+
+NESTED_AND_UNCLOSED = [
+    # Code blocks nested in code blocks
+    '<pre lang="py"><code>x<pre><code class="language-mermaid">A--&gt;B</code></pre><p>',
+    '<pre lang="py"><code><a href="README.md">\n<pre><code class="mermaid"></code></pre>[!NOTE]',
+    '<pre lang="py"><code></pre>[!TIP] </p><pre lang="mermaid"><code></p></code></pre></code>',
+    '<pre lang="mermaid"><code>a<pre><code class="mermaid">b</code></pre>c</code></pre>',
+    '<pre lang="py"><code><pre lang="py"><code>x</code></pre></code></pre>',
+    # Unclosed blocks and code spans
+    '<pre lang="py"><code>no end <code>#fff</code>',
+    '<pre><code class="language-mermaid">A--&gt;B',
+    '<pre lang="mermaid"><code>x</code><img src="i.png">',
+    '<code>#abc <a href="README.md">r</a>',
+    '</code></pre><pre lang="js"><code>y</code></pre>',
+    # Code blocks crossing a blockquote's end
+    '<blockquote>\n<p>[!NOTE]</p><pre lang="py"><code></blockquote></code></pre>',
+    '<blockquote>[!NOTE]<pre lang="mermaid"><code></p></blockquote>[!NOTE]</code></pre>',
+    '<blockquote>\n<pre><code class="mermaid"><a href="README.md"></a></blockquote></code></pre>',
+    '<blockquote>\n<pre lang="mermaid"><code></pre></blockquote></code></pre></code></pre>',
+    # Mermaid sources that unescape to markup
+    '<pre><code class="language-mermaid">A[&quot;&lt;pre lang=&quot;x&quot;&gt;&lt;code&gt;y&quot;]</code></pre>',
+    '<pre lang="mermaid"><code>&lt;blockquote&gt;[!NOTE] &lt;a href="README.md"&gt;</code></pre>',
+    '<pre lang="mermaid"><code>&lt;code&gt;#fff&lt;/code&gt; &lt;img src="x.png"&gt;</code></pre>',
+]
+
+
+@pytest.mark.parametrize("html", NESTED_AND_UNCLOSED)
+def test_nested_and_unclosed_blocks_match_chain(html):
+    assert fused(html) == chain(html)
+
+
+FRAGMENTS = [
+    '<pre lang="py"><code>', '<pre><code class="language-mermaid">', '<pre lang="mermaid"><code>',
+    '<pre><code class="mermaid">', "</code></pre>", "</code>", "</pre>", "<pre>", "<code>", '<code class="x">',
+    "<blockquote>", "</blockquote>", "<blockquote>\n<p>[!NOTE]</p>", "<code>#fff</code>", "<code>rgb(1,2,3)</code>",
+    '<a href="README.md">', '<a href="sub/page.md" title="t">', "</a>", '<img src="x.png">',
+    '<img src="../static/Docs.png" />', "[!NOTE]", "[!WARNING] ", "<p>", "</p>", "text ", "\n",
+    "&lt;pre lang=&quot;x&quot;&gt;&lt;code&gt;", "&lt;blockquote&gt;", "&lt;/code&gt;&lt;/pre&gt;",
+    "&lt;a href=&quot;README.md&quot;&gt;", "&lt;code&gt;#abc&lt;/code&gt;", "&lt;/blockquote&gt;",
+]
+
+
+def test_random_fragments_match_chain():
+    rng = random.Random(7)
+    for _ in range(3000):
+        html = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 20)))
+        assert fused(html) == chain(html), html
+
+
+@pytest.mark.parametrize(
+    "path", sorted(glob.glob(os.path.join(PLUGIN_DIR, "docs", "*.md")) + glob.glob(os.path.join(PLUGIN_DIR, "*.md")))
+)
+def test_bundled_docs_match_chain(path):
+    convert, _name = get_markdown_converter()
+    with open(path, "r", encoding="utf-8") as f:
+        html = convert(f.read())
+    for current_dir in ("", "sub"):
+        assert fused(html, "Docs", current_dir) == chain(html, "Docs", current_dir)
@@ -0,0 +1,88 @@
+"""Memory and disk render caches."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from plugins.Docs.render_cache import DiskRenderCache, RenderCache
+
+
+def test_disk_cache_prune_keeps_recently_read_files(tmp_path):
+    cache = DiskRenderCache(str(tmp_path), 10_000)
+    for n, key in enumerate(("a" * 40, "b" * 40, "c" * 40)):
+        cache.put(key, "x" * 4000)
+        os.utime(cache._path(key), (1000 + n, 1000 + n))
+    assert cache.get("a" * 40) is not None
+
+    assert cache.prune() == 1
+    assert cache.get("a" * 40) is not None
+    assert cache.get("b" * 40) is None
+    assert cache.get("c" * 40) is not None
+
+
+def test_get_or_create_computes_once_for_concurrent_misses():
+    cache = RenderCache(10, 10_000)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "html"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("k", factory))) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    deadline = time.monotonic() + 5
+    while cache.coalesced < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert results == ["html"] * 5
+    assert cache.get("k") == "html"
+
+
+def test_get_or_create_passes_errors_to_waiters_and_caches_nothing():
+    cache = RenderCache(10, 10_000)
+
+    def factory():
+        raise ValueError("broken")
+
+    with pytest.raises(ValueError):
+        cache.get_or_create("k", factory)
+    assert "k" not in cache
+    assert cache.get_or_create("k", lambda: "ok") == "ok"
+
+
+def test_eviction_by_entries_and_bytes():
+    cache = RenderCache(2, 10_000)
+    cache.put("a", "1", size=10)
+    cache.put("b", "2", size=10)
+    cache.get("a")
+    cache.put("c", "3", size=10)
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+    cache = RenderCache(10, 25)
+    cache.put("a", "1", size=10)
+    cache.put("b", "2", size=10)
+    cache.put("c", "3", size=10)
+    assert "a" not in cache and len(cache) == 2
+    cache.put("big", "x", size=100)
+    assert "big" not in cache
+
+
+def test_changed_version_drops_entry():
+    cache = RenderCache(10, 10_000)
+    cache.put("k", "old", mtime=(1.0, 10, ""))
+    assert cache.get("k", mtime=(1.0, 10, "")) == "old"
+    assert cache.get("k", mtime=(2.0, 10, "")) is None
+    assert "k" not in cache
@@ -0,0 +1,68 @@
+"""Doc rendering through the memory and disk caches, with several workers sharing the file cache."""
+
+from plugins.Docs import indexer
+
+GUIDE = ("core", "sub/guide.md")
+
+
+def render(plugin, source_id, path):
+    with plugin._app.test_request_context("/"):
+        return plugin._render_doc_html(source_id, path, "en")[0]
+
+
+def test_edit_indexed_by_another_worker_is_rendered(make_plugin, project, edit_file):
+    worker_a, worker_b = make_plugin(), make_plugin()
+    indexer.build_docs_index(worker_a)
+    indexer.build_docs_index(worker_b)
+    assert "heats" in render(worker_b, *GUIDE)
+
+    edit_file(project / "docs" / "sub" / "guide.md", "# Guide\n\nThe pump cools water.\n")
+    indexer.build_docs_index(worker_a)
+    assert "cools" in render(worker_a, *GUIDE)
+    indexer.build_docs_index(worker_b)
+    assert "cools" in render(worker_b, *GUIDE)
+
+
+def test_disk_cache_key_ignores_hash_of_entry_with_other_size(make_plugin, project, edit_file):
+    plugin = make_plugin()
+    indexer.build_docs_index(plugin)
+    assert "heats" in render(plugin, *GUIDE)
+    guide = project / "docs" / "sub" / "guide.md"
+    entry = plugin._doc_entry_map[GUIDE]
+
+    # An entry that got the new mtime but kept the hash of the old content
+    edit_file(guide, "# Guide\n\nThe pump cools water quickly.\n")
+    entry["mtime"] = guide.stat().st_mtime
+    assert "cools" in render(plugin, *GUIDE)
+
+
+def wait_for_prewarm(plugin):
+    plugin._prewarm_executor.submit(lambda: None).result()
+
+
+def test_prewarm_uses_script_root_of_requests(make_plugin):
+    plugin = make_plugin(prewarm_mode="popular")
+    indexer.build_docs_index(plugin)
+    with plugin._app.test_request_context("/", environ_overrides={"SCRIPT_NAME": "/home"}):
+        assert 'href="/home/docs/' in plugin._render_doc_html("core", "index.md", "en")[0]
+    plugin._html_cache.clear()
+
+    indexer.build_docs_index(plugin)
+    wait_for_prewarm(plugin)
+    assert ("core", "index.md", "en", "/home") in plugin._html_cache
+    with plugin._app.test_request_context("/"):
+        assert 'href="/docs/' in plugin._render_doc_html("core", "index.md", "en")[0]
+
+
+def test_rebuild_cancels_prewarm(make_plugin):
+    plugin = make_plugin(prewarm_mode="all")
+    indexer.build_docs_index(plugin)
+    wait_for_prewarm(plugin)
+    plugin._html_cache.clear()
+
+    run = plugin._prewarm_run
+    plugin._cancel_prewarm()
+    plugin._prewarm_docs(run)
+    assert len(plugin._html_cache) == 0
+    plugin._prewarm_docs(plugin._prewarm_run)
+    assert len(plugin._html_cache) == 2
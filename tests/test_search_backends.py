@@ -0,0 +1,57 @@
+"""Whoosh and SQLite FTS5 backends must find the same documents."""
+
+import pytest
+
+from plugins.Docs import indexer
+from plugins.Docs.search_backends import make_search_backend
+
+DOCS = {
+    "heating.md": "# Heating\n\nThe heat pump warms the house. Configure the pump schedule.\n",
+    "sensors.md": (
+        "# Sensors\n\nEach sensor reports temperature and humidity.\n\n## Calibration\n\nCalibrate a sensor.\n"
+    ),
+    "network.md": "# Network\n\nDevices connect over MQTT. The broker address is set in settings.\n",
+    "heating.ru.md": "# Отопление\n\nТепловой насос обогревает дом.\n",
+}
+QUERIES = ["pump", "sensor", "temperature", "mqtt broker", "calibration", "settings", "насос", "missing"]
+
+
+@pytest.fixture
+def backends(make_plugin, project):
+    for name, text in DOCS.items():
+        (project / "docs" / name).write_text(text, encoding="utf-8")
+    plugin = make_plugin()
+    indexer.build_docs_index(plugin)
+    found = {}
+    for name in ("whoosh", "sqlite"):
+        backend = make_search_backend(name, plugin)
+        if not backend.available():
+            pytest.skip(f"{name} search backend is not available")
+        assert backend.build()
+        found[name] = backend
+    yield found
+    for backend in found.values():
+        backend.clear()
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_backends_find_the_same_docs(backends, query):
+    results = {
+        name: {(hit["source_id"], hit["path"]) for hit in backend.search(query)} for name, backend in backends.items()
+    }
+    assert results["whoosh"] == results["sqlite"]
+    assert bool(results["sqlite"]) == (query != "missing")
+
+
+def test_backends_follow_incremental_updates(backends, project, edit_file):
+    plugin = backends["whoosh"].plugin
+    edit_file(project / "docs" / "network.md", "# Network\n\nDevices connect over Zigbee.\n")
+    (project / "docs" / "sensors.md").unlink()
+    indexer.build_docs_index(plugin)
+    changed, removed = {("core", "network.md")}, {("core", "sensors.md")}
+    for backend in backends.values():
+        assert backend.build(changed, removed)
+    for query in ("zigbee", "mqtt", "sensor"):
+        results = {name: {hit["path"] for hit in backend.search(query)} for name, backend in backends.items()}
+        assert results["whoosh"] == results["sqlite"]
+    assert {hit["path"] for hit in backends["sqlite"].search("zigbee")} == {"network.md"}
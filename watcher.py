@@ -0,0 +1,187 @@
+"""Doc source watcher: reports changed doc files in debounced batches, using watchdog (inotify on Linux)
+when it is installed and periodic mtime polling otherwise."""
+
+from __future__ import annotations
+
+import os
+import time
+from threading import Condition, Thread
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# Bursts are flushed at the latest this many debounce intervals after their first event
+_MAX_DELAY_FACTOR = 10
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards watchdog events for .md files and relevant directories to a DocsWatcher."""
+
+    def __init__(self, watcher: "DocsWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event: Any) -> None:
+        if event.event_type not in ("created", "modified", "deleted", "moved"):
+            return
+        paths = [event.src_path]
+        if getattr(event, "dest_path", ""):
+            paths.append(event.dest_path)
+        if event.is_directory:
+            if event.event_type != "modified" and any(self.watcher.is_source_dir(p) for p in paths):
+                self.watcher.notify((), rescan=True)
+            return
+        self.watcher.notify(p for p in paths if p.lower().endswith(".md"))
+
+
+class DocsWatcher:
+    """Watches doc sources and calls on_change(paths, rescan) once changes settle.
+
+    paths are added, modified or removed .md files. rescan is True when a doc directory appeared,
+    disappeared or moved, so the caller should rescan sources instead of updating single files.
+    on_change returns False if it could not take the batch now; it is then retried after the
+    debounce interval. get_roots() lists (directory, recursive) pairs to watch with inotify;
+    snapshot() returns {doc file: (mtime, size)} for polling.
+    """
+
+    def __init__(
+        self,
+        get_roots: Callable[[], List[Tuple[str, bool]]],
+        snapshot: Callable[[], Dict[str, Tuple[float, int]]],
+        on_change: Callable[[Set[str], bool], bool],
+        is_source_dir: Callable[[str], bool],
+        debounce: float,
+        poll_interval: float,
+        use_inotify: bool = True,
+        logger: Any = None,
+    ):
+        self.get_roots = get_roots
+        self.snapshot = snapshot
+        self.on_change = on_change
+        self.is_source_dir = is_source_dir
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = "inotify" if use_inotify and Observer is not None else "polling"
+        self.logger = logger
+        self._cond = Condition()
+        self._pending: Set[str] = set()
+        self._rescan = False
+        self._first_event = 0.0
+        self._last_event = 0.0
+        self._stopped = False
+        self._thread: Optional[Thread] = None
+        self._observer: Any = None
+        self._files: Dict[str, Tuple[float, int]] = {}
+
+    def start(self) -> None:
+        if self.backend == "inotify":
+            self.reschedule()
+        else:
+            self._files = self._safe_snapshot()
+        self._thread = Thread(target=self._run, name="DocsWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        observer, self._observer = self._observer, None
+        if observer is not None:
+            observer.stop()
+
+    def reschedule(self) -> None:
+        """Re-read get_roots() (e.g. after plugins were added); polling picks up new sources by itself."""
+        if self.backend != "inotify":
+            return
+        observer = Observer()
+        handler = _EventHandler(self)
+        for path, recursive in self.get_roots():
+            if not os.path.isdir(path):
+                continue
+            try:
+                observer.schedule(handler, path, recursive=recursive)
+            except OSError as ex:
+                self._log("warning", "Docs watcher cannot watch %s: %s", path, ex)
+        observer.daemon = True
+        observer.start()
+        old, self._observer = self._observer, observer
+        if old is not None:
+            old.stop()
+
+    def notify(self, paths: Iterable[str], rescan: bool = False) -> None:
+        """Record changed files (and/or a rescan request); they are delivered after the debounce interval."""
+        paths = set(paths)
+        if not paths and not rescan:
+            return
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending and not self._rescan:
+                self._first_event = now
+            self._pending |= paths
+            self._rescan = self._rescan or rescan
+            self._last_event = now
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        next_poll = time.monotonic() + self.poll_interval
+        while True:
+            paths: Set[str] = set()
+            rescan = False
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                due = None
+                if self._pending or self._rescan:
+                    due = min(
+                        self._last_event + self.debounce, self._first_event + self.debounce * _MAX_DELAY_FACTOR
+                    )
+                deadlines = [d for d in (due, next_poll if self.backend == "polling" else None) if d is not None]
+                if not deadlines:
+                    self._cond.wait()
+                    continue
+                if min(deadlines) > now:
+                    self._cond.wait(min(deadlines) - now)
+                    continue
+                if due is not None and due <= now:
+                    paths, rescan = self._pending, self._rescan
+                    self._pending, self._rescan = set(), False
+            if self.backend == "polling" and next_poll <= now:
+                self._poll()
+                next_poll = now + self.poll_interval
+            if paths or rescan:
+                self._deliver(paths, rescan)
+
+    def _poll(self) -> None:
+        files = self._safe_snapshot()
+        old = self._files
+        self._files = files
+        changed = {p for p, stat in files.items() if old.get(p) != stat}
+        changed.update(p for p in old if p not in files)
+        if changed:
+            self.notify(changed)
+
+    def _safe_snapshot(self) -> Dict[str, Tuple[float, int]]:
+        try:
+            return self.snapshot()
+        except Exception as ex:
+            self._log("warning", "Docs watcher scan failed: %s", ex)
+            return dict(self._files)
+
+    def _deliver(self, paths: Set[str], rescan: bool) -> None:
+        try:
+            accepted = self.on_change(paths, rescan)
+        except Exception as ex:
+            self._log("exception", "Docs watcher update failed: %s", ex)
+            return
+        if not accepted:
+            self.notify(paths, rescan=rescan)
+
+    def _log(self, level: str, msg: str, *args: Any) -> None:
+        if self.logger is not None:
+            getattr(self.logger, level)(msg, *args)